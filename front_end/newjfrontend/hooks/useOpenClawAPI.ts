@@ -113,6 +113,22 @@ export function useOpenClawAPI() {
     return response.json()
   }, [])
 
+  // Fetch many tasks in one request ({ [taskId]: task }); prefer this over
+  // calling fetchTask once per task when rendering lists
+  const fetchTasksBatch = useCallback(async (taskIds: string[]) => {
+    const response = await fetch('/api/openclaw/tasks:batchGet', {
+      method: 'POST',
+      headers: { 'Content-Type': 'application/json' },
+      body: JSON.stringify({ ids: taskIds }),
+    })
+
+    if (!response.ok) {
+      throw new Error('Failed to fetch tasks')
+    }
+
+    return response.json()
+  }, [])
+
   const createInstance = useCallback(async (request: CreateInstanceRequest) => {
     const response = await fetch('/api/openclaw/instances', {
       method: 'POST',
@@ -137,6 +153,21 @@ export function useOpenClawAPI() {
     return response.json()
   }, [])
 
+  // Fetch many instances in one request ({ [instanceId]: instance })
+  const fetchInstancesBatch = useCallback(async (instanceIds: string[]) => {
+    const response = await fetch('/api/openclaw/instances:batchGet', {
+      method: 'POST',
+      headers: { 'Content-Type': 'application/json' },
+      body: JSON.stringify({ ids: instanceIds }),
+    })
+
+    if (!response.ok) {
+      throw new Error('Failed to fetch instances')
+    }
+
+    return response.json()
+  }, [])
+
   return {
     createTask,
     cancelTask,
@@ -144,7 +175,9 @@ export function useOpenClawAPI() {
     submitContext,
     fetchTasks,
     fetchTask,
+    fetchTasksBatch,
     createInstance,
     fetchInstances,
+    fetchInstancesBatch,
   }
 }
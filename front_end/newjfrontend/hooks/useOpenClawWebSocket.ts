@@ -50,12 +50,15 @@ export function useOpenClawWebSocket(taskId: string | null) {
   }, [])
 
   const handleMessage = useCallback((data: any) => {
-    if (data.type === 'event' && data.event) {
+    if (data.type === 'event_batch' && Array.isArray(data.events)) {
+      // Coalesced events, in order
+      data.events.forEach((event: any) => handleMessage({ type: 'event', event }))
+    } else if (data.type === 'event' && data.event) {
       const event = data.event
 
       // Add event to store
       addEvent({
-        id: `${event.job_id}-${Date.now()}`,
+        id: `${event.job_id}-${event.timestamp_ns ?? Date.now()}`,
         taskId: event.job_id,
         type: event.type,
         payload: event.payload,
@@ -5,24 +5,43 @@ A streamlined FastAPI application with ChatterboxTTS, Ollama, and Whisper
 
 from fastapi import FastAPI, HTTPException, UploadFile, File
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse, JSONResponse
-from contextlib import asynccontextmanager
+from fastapi.responses import FileResponse, JSONResponse, StreamingResponse
+from collections import OrderedDict
+from contextlib import asynccontextmanager, nullcontext
 from pydantic import BaseModel
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, AsyncIterator, Tuple
 import uvicorn
+import asyncio
+import functools
+import hashlib
+import json
 import os
+import re
+import struct
 import sys
 import logging
 import tempfile
-import uuid
+import time
+import zlib
+import numpy as np
 import soundfile as sf
-import whisper
-import requests
+import httpx
 from pathlib import Path
 
+# faster-whisper (CTranslate2 backend) import
+try:
+    from faster_whisper import WhisperModel, BatchedInferencePipeline, decode_audio
+    from faster_whisper.audio import pad_or_trim
+    from faster_whisper.tokenizer import Tokenizer
+except ImportError:
+    print("⚠️  faster-whisper not available")
+    WhisperModel = None
+    BatchedInferencePipeline = None
+
 # ChatterboxTTS import
 try:
-    from chatterbox.tts import ChatterboxTTS, punc_norm
+    import torch
+    from chatterbox.tts import ChatterboxTTS
 except ImportError:
     print("⚠️  ChatterboxTTS not available")
     ChatterboxTTS = None
@@ -36,17 +55,50 @@ logger = logging.getLogger(__name__)
 
 # Environment variables
 OLLAMA_URL = os.getenv("OLLAMA_URL", "http://localhost:11434")
+# Optional comma-separated Ollama hosts; chat sessions are pinned to one so its KV cache is reused
+OLLAMA_URLS = [url.strip() for url in os.getenv("OLLAMA_URLS", OLLAMA_URL).split(",") if url.strip()]
+OLLAMA_KEEP_ALIVE = os.getenv("OLLAMA_KEEP_ALIVE", "30m")
+OLLAMA_NUM_CTX = int(os.getenv("OLLAMA_NUM_CTX", "4096"))
+SESSION_CACHE_SIZE = int(os.getenv("SESSION_CACHE_SIZE", "256"))
+# Content-addressed caches for synthesized speech and transcriptions (LRU entries)
+AUDIO_CACHE_SIZE = int(os.getenv("AUDIO_CACHE_SIZE", "1000"))
 TTS_DEVICE = os.getenv("TTS_DEVICE", "cuda" if os.path.exists("/dev/nvidia0") else "cpu")
 WHISPER_MODEL = os.getenv("WHISPER_MODEL", "base")
+WHISPER_COMPUTE_TYPE = os.getenv("WHISPER_COMPUTE_TYPE", "int8_float16" if TTS_DEVICE == "cuda" else "int8")
+WHISPER_BATCH_SIZE = int(os.getenv("WHISPER_BATCH_SIZE", "16"))
+WHISPER_BEAM_SIZE = int(os.getenv("WHISPER_BEAM_SIZE", "5"))
+TRANSCRIBE_MAX_BATCH = int(os.getenv("TRANSCRIBE_MAX_BATCH", "8"))
+TRANSCRIBE_MAX_WAIT = float(os.getenv("TRANSCRIBE_MAX_WAIT", "0.05"))
 DEFAULT_OLLAMA_MODEL = os.getenv("DEFAULT_OLLAMA_MODEL", "mistral")
 
+# ChatterboxTTS output sample rate and CUDA autocast precision (float16, bfloat16 or float32)
+TTS_SAMPLE_RATE = 24000
+TTS_DTYPE = os.getenv("TTS_DTYPE", "float16")
+
+# Compile the T3 token decoder backbone into CUDA graphs (recompiles per new prompt length bucket)
+TTS_COMPILE = os.getenv("TTS_COMPILE", "true" if TTS_DEVICE.startswith("cuda") else "false").lower() == "true"
+
+# Run one dummy inference per model at startup so the first request skips CUDA/cuDNN init
+WARMUP_MODELS = os.getenv("WARMUP_MODELS", "true").lower() == "true"
+
 # Audio output directory
 AUDIO_DIR = Path("/tmp/cody_audio")
 AUDIO_DIR.mkdir(exist_ok=True)
+# Synthesized WAVs untouched for this long are unlinked by the background reaper
+AUDIO_TTL_SECONDS = int(os.getenv("AUDIO_TTL_SECONDS", "600"))
+AUDIO_REAP_INTERVAL = int(os.getenv("AUDIO_REAP_INTERVAL", "60"))
 
 # Global models
 whisper_model = None
-tts_model = None
+tts_models: List[Any] = []   # one ChatterboxTTS instance per device
+tts_pool: Optional[asyncio.Queue] = None  # idle instances, checked out per request
+
+# Conversation history per chat session (LRU), so clients only send the new turn
+session_cache: "OrderedDict[str, List[Dict[str, str]]]" = OrderedDict()
+
+# SHA-256 of normalized text -> synthesized WAV under AUDIO_DIR (LRU, evicted files are unlinked)
+tts_cache: "OrderedDict[str, Path]" = OrderedDict()
+transcription_scheduler = None
 
 # ─── Pydantic Models ────────────────────────────────────────────────────────────
 class ChatRequest(BaseModel):
@@ -54,6 +106,7 @@ class ChatRequest(BaseModel):
     model: Optional[str] = DEFAULT_OLLAMA_MODEL
     history: Optional[List[Dict[str, str]]] = []
     stream: Optional[bool] = False
+    session_id: Optional[str] = None
 
 class TTSRequest(BaseModel):
     text: str
@@ -68,35 +121,254 @@ class ChatResponse(BaseModel):
     audio_path: Optional[str] = None
     model: str
 
+# ─── Transcription Scheduler ────────────────────────────────────────────────────
+class TranscriptionScheduler:
+    """Merge concurrent transcription requests into batched Whisper calls.
+
+    Requests are collected for up to ``max_wait`` seconds or ``max_batch`` items,
+    sorted by length and split into duration buckets. Clips that fit in one
+    30 s Whisper window are encoded and decoded together in a single
+    CTranslate2 call; longer clips go through the batched pipeline one by one on
+    a separate worker task, so a long upload never holds up the short batches.
+    Results are cached by a SHA-256 of the PCM samples, so repeated uploads skip
+    the model entirely.
+    """
+
+    SAMPLE_RATE = 16000
+    WINDOW_SECONDS = 30.0
+    BUCKETS = (10.0, 30.0, 120.0)
+
+    def __init__(self, pipeline, max_batch: int = 8, max_wait: float = 0.05, cache_size: int = 1000):
+        self.pipeline = pipeline
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.cache_size = cache_size
+        self._cache: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self._long_queue: asyncio.Queue = asyncio.Queue()
+        self._task: Optional[asyncio.Task] = None
+        self._long_task: Optional[asyncio.Task] = None
+
+    def start(self):
+        self._task = asyncio.create_task(self._run())
+        self._long_task = asyncio.create_task(self._run_long())
+
+    async def stop(self):
+        for task in (self._task, self._long_task):
+            if task:
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
+        self._task = self._long_task = None
+
+    async def transcribe(self, audio: np.ndarray) -> Dict[str, Any]:
+        """Queue a 16 kHz float32 waveform and wait for its transcription"""
+        key = hashlib.sha256(audio.tobytes()).hexdigest()
+        cached = self._cache.get(key)
+        if cached is not None:
+            self._cache.move_to_end(key)
+            return cached
+
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((audio, future))
+        result = await future
+
+        self._cache[key] = result
+        if len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+        return result
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            items = [await self._queue.get()]
+            deadline = loop.time() + self.max_wait
+            while len(items) < self.max_batch:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    items.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            # Clips longer than one window are handed to the long-clip worker
+            window = int(self.WINDOW_SECONDS * self.SAMPLE_RATE)
+            short = []
+            for item in items:
+                if len(item[0]) > window:
+                    self._long_queue.put_nowait(item)
+                else:
+                    short.append(item)
+
+            short.sort(key=lambda item: len(item[0]))
+            for bucket in self._bucketize(short):
+                audios = [audio for audio, _ in bucket]
+                try:
+                    results = await self._transcribe_short(audios)
+                except Exception as e:
+                    logger.error(f"Batched transcription failed: {e}")
+                    for _, future in bucket:
+                        if not future.done():
+                            future.set_exception(e)
+                    continue
+                for (_, future), result in zip(bucket, results):
+                    if not future.done():
+                        future.set_result(result)
+
+    async def _run_long(self):
+        """Transcribe long clips one at a time, off the batching loop"""
+        while True:
+            audio, future = await self._long_queue.get()
+            if future.done():  # Caller went away while the clip was queued
+                continue
+            try:
+                result = await asyncio.to_thread(self._transcribe_long, audio)
+            except Exception as e:
+                logger.error(f"Long transcription failed: {e}")
+                if not future.done():
+                    future.set_exception(e)
+                continue
+            if not future.done():
+                future.set_result(result)
+
+    def _bucketize(self, items):
+        buckets: Dict[int, list] = {}
+        for item in items:
+            duration = len(item[0]) / self.SAMPLE_RATE
+            index = next((i for i, limit in enumerate(self.BUCKETS) if duration < limit), len(self.BUCKETS))
+            buckets.setdefault(index, []).append(item)
+        return [buckets[index] for index in sorted(buckets)]
+
+    def _transcribe_long(self, audio: np.ndarray) -> Dict[str, Any]:
+        segments, info = self.pipeline.transcribe(audio, batch_size=WHISPER_BATCH_SIZE)
+        text = "".join(segment.text for segment in segments)
+        return {"text": text, "language": info.language}
+
+    def _encode_short(self, audios: List[np.ndarray]):
+        """Feature extraction, encoder pass and language detection (blocking)"""
+        model = self.pipeline.model
+        # Every clip is padded to the 30 s window so the whole bucket shares one encoder pass
+        features = np.stack([pad_or_trim(model.feature_extractor(audio)) for audio in audios])
+        encoder_output = model.encode(features)
+
+        if model.model.is_multilingual:
+            detected = model.model.detect_language(encoder_output)
+            languages = [candidates[0][0][2:-2] for candidates in detected]
+        else:
+            languages = ["en"] * len(audios)
+
+        tokenizers = [
+            Tokenizer(model.hf_tokenizer, model.model.is_multilingual, task="transcribe", language=language)
+            for language in languages
+        ]
+        return encoder_output, languages, tokenizers
+
+    async def _transcribe_short(self, audios: List[np.ndarray]) -> List[Dict[str, Any]]:
+        model = self.pipeline.model
+        encoder_output, languages, tokenizers = await asyncio.to_thread(self._encode_short, audios)
+        prompts = [list(tokenizer.sot_sequence) + [tokenizer.no_timestamps] for tokenizer in tokenizers]
+
+        # CTranslate2 runs generation on its own threads; poll so the event loop stays free
+        futures = model.model.generate(
+            encoder_output,
+            prompts,
+            beam_size=WHISPER_BEAM_SIZE,
+            max_length=448,
+            suppress_blank=True,
+            suppress_tokens=[-1],
+            asynchronous=True
+        )
+        while not all(future.done() for future in futures):
+            await asyncio.sleep(0.001)
+        results = [future.result() for future in futures]
+
+        return [
+            {"text": tokenizer.decode(result.sequences_ids[0]), "language": language}
+            for tokenizer, result, language in zip(tokenizers, results, languages)
+        ]
+
 # ─── Lifespan Context Manager ──────────────────────────────────────────────────
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Load models on startup, cleanup on shutdown"""
-    global whisper_model, tts_model
+    global whisper_model, tts_models, tts_pool, transcription_scheduler
 
     logger.info("🚀 Starting Cody - Headless AI Assistant")
 
-    # Load Whisper model
-    try:
-        logger.info(f"📥 Loading Whisper model: {WHISPER_MODEL}")
-        whisper_model = whisper.load_model(WHISPER_MODEL)
-        logger.info("✅ Whisper model loaded successfully")
-    except Exception as e:
-        logger.error(f"❌ Failed to load Whisper model: {e}")
-
-    # Load ChatterboxTTS model
-    if ChatterboxTTS:
+    # Load Whisper model (CTranslate2 backend, batched pipeline)
+    if WhisperModel:
         try:
-            logger.info(f"📥 Loading ChatterboxTTS on {TTS_DEVICE}")
-            tts_model = ChatterboxTTS.from_pretrained(device=TTS_DEVICE)
-            logger.info("✅ ChatterboxTTS model loaded successfully")
+            logger.info(f"📥 Loading Whisper model: {WHISPER_MODEL} ({WHISPER_COMPUTE_TYPE} on {TTS_DEVICE})")
+            base_model = WhisperModel(
+                WHISPER_MODEL,
+                device=TTS_DEVICE,
+                compute_type=WHISPER_COMPUTE_TYPE,
+                num_workers=1
+            )
+            whisper_model = BatchedInferencePipeline(model=base_model)
+            transcription_scheduler = TranscriptionScheduler(
+                whisper_model,
+                max_batch=TRANSCRIBE_MAX_BATCH,
+                max_wait=TRANSCRIBE_MAX_WAIT,
+                cache_size=AUDIO_CACHE_SIZE
+            )
+            transcription_scheduler.start()
+            logger.info("✅ Whisper model loaded successfully")
         except Exception as e:
-            logger.error(f"❌ Failed to load ChatterboxTTS: {e}")
-            tts_model = None
+            logger.error(f"❌ Failed to load Whisper model: {e}")
+            whisper_model = None
+
+    # Load ChatterboxTTS model (one instance per visible GPU)
+    if ChatterboxTTS:
+        if TTS_DEVICE.startswith("cuda"):
+            torch.backends.cudnn.benchmark = True
+
+        if TTS_DEVICE == "cuda" and torch.cuda.device_count() > 1:
+            devices = [f"cuda:{i}" for i in range(torch.cuda.device_count())]
+        else:
+            devices = [TTS_DEVICE]
+
+        tts_pool = asyncio.Queue()
+        for device in devices:
+            try:
+                logger.info(f"📥 Loading ChatterboxTTS on {device}")
+                model = ChatterboxTTS.from_pretrained(device=device)
+                if TTS_COMPILE:
+                    compile_tts_decoder(model)
+                tts_models.append(model)
+                tts_pool.put_nowait(model)
+                logger.info(f"✅ ChatterboxTTS model loaded successfully on {device}")
+            except Exception as e:
+                logger.error(f"❌ Failed to load ChatterboxTTS on {device}: {e}")
+
+    # Warm up models (kernel selection, lazy weight materialization)
+    if WARMUP_MODELS:
+        if transcription_scheduler:
+            try:
+                logger.info("🔥 Warming up Whisper")
+                await transcription_scheduler.transcribe(np.zeros(TranscriptionScheduler.SAMPLE_RATE, dtype=np.float32))
+            except Exception as e:
+                logger.warning(f"⚠️  Whisper warmup failed: {e}")
+        for model in tts_models:
+            try:
+                logger.info(f"🔥 Warming up ChatterboxTTS on {model.device}")
+                await asyncio.to_thread(generate_speech, model, "Warm up the speech kernels.")
+            except Exception as e:
+                # A failing compiled decoder was already restored by generate_speech
+                logger.warning(f"⚠️  ChatterboxTTS warmup failed on {model.device}: {e}")
+
+    # Shared HTTP client (keep-alive connection pool) for Ollama
+    app.state.http = httpx.AsyncClient(
+        timeout=120,
+        limits=httpx.Limits(max_keepalive_connections=32)
+    )
 
     # Verify Ollama connection
     try:
-        response = requests.get(f"{OLLAMA_URL}/api/tags", timeout=5)
+        response = await app.state.http.get(f"{OLLAMA_URL}/api/tags", timeout=5)
         if response.status_code == 200:
             models = response.json().get("models", [])
             logger.info(f"✅ Ollama connected. Available models: {[m['name'] for m in models]}")
@@ -105,16 +377,22 @@ async def lifespan(app: FastAPI):
     except Exception as e:
         logger.error(f"❌ Failed to connect to Ollama: {e}")
 
+    audio_reaper = asyncio.create_task(reap_audio_files())
+
     logger.info("✅ Cody initialization complete")
 
     yield
 
     # Cleanup
     logger.info("🧹 Shutting down Cody...")
+    audio_reaper.cancel()
+    if transcription_scheduler:
+        await transcription_scheduler.stop()
     if whisper_model:
         del whisper_model
-    if tts_model:
-        del tts_model
+    tts_models.clear()
+    tts_pool = None
+    await app.state.http.aclose()
     logger.info("✅ Shutdown complete")
 
 # ─── FastAPI App ────────────────────────────────────────────────────────────────
@@ -143,39 +421,89 @@ async def health_check():
         "status": "healthy",
         "service": "Cody AI Assistant",
         "whisper": whisper_model is not None,
-        "tts": tts_model is not None,
+        "tts": bool(tts_models),
+        "tts_instances": len(tts_models),
         "ollama_url": OLLAMA_URL
     }
 
 # ─── Ollama Integration ─────────────────────────────────────────────────────────
-def query_ollama(prompt: str, model: str = DEFAULT_OLLAMA_MODEL, history: List[Dict[str, str]] = None) -> str:
-    """Query Ollama LLM"""
-    try:
-        messages = []
-
-        # Add history if provided
-        if history:
-            for msg in history:
-                messages.append({"role": msg.get("role", "user"), "content": msg.get("content", "")})
-
-        # Add current prompt
-        messages.append({"role": "user", "content": prompt})
-
-        payload = {
-            "model": model,
-            "messages": messages,
-            "stream": False
-        }
+def ollama_url_for(session_id: Optional[str]) -> str:
+    """Pick the Ollama host for a session; the same session always lands on the same host"""
+    if not session_id or len(OLLAMA_URLS) == 1:
+        return OLLAMA_URLS[0]
+    return OLLAMA_URLS[zlib.crc32(session_id.encode()) % len(OLLAMA_URLS)]
+
+def session_messages(session_id: Optional[str]) -> List[Dict[str, str]]:
+    """Return the stored history for a session (a fresh list when there is no session)"""
+    if not session_id:
+        return []
+    messages = session_cache.get(session_id)
+    if messages is None:
+        messages = session_cache[session_id] = []
+        if len(session_cache) > SESSION_CACHE_SIZE:
+            session_cache.popitem(last=False)
+    else:
+        session_cache.move_to_end(session_id)
+    return messages
+
+def prepare_messages(
+    prompt: str,
+    history: List[Dict[str, str]] = None,
+    session_id: Optional[str] = None
+) -> Tuple[List[Dict[str, str]], int]:
+    """Build the message list for a chat turn, appending to the session history if any.
+
+    Returns the list and its length before this turn; on failure the caller
+    truncates back to that length so the session never keeps a dangling user turn.
+    """
+    messages = session_messages(session_id)
+    start = len(messages)
+
+    # Client history only seeds a new session; once the server holds the
+    # conversation, clients resending their full history would duplicate it
+    if history and not messages:
+        for msg in history:
+            messages.append({"role": msg.get("role", "user"), "content": msg.get("content", "")})
+
+    # Add current prompt
+    messages.append({"role": "user", "content": prompt})
+    return messages, start
+
+def chat_payload(model: str, messages: List[Dict[str, str]], stream: bool) -> Dict[str, Any]:
+    return {
+        "model": model,
+        "messages": messages,
+        "stream": stream,
+        "keep_alive": OLLAMA_KEEP_ALIVE,
+        "options": {"num_ctx": OLLAMA_NUM_CTX}
+    }
 
-        response = requests.post(
-            f"{OLLAMA_URL}/api/chat",
-            json=payload,
-            timeout=120
+async def query_ollama(
+    prompt: str,
+    model: str = DEFAULT_OLLAMA_MODEL,
+    history: List[Dict[str, str]] = None,
+    session_id: Optional[str] = None
+) -> str:
+    """Query Ollama LLM.
+
+    With a ``session_id`` the conversation is kept server-side and ``history`` is
+    only used to seed a new session. The prompt prefix stays identical between
+    turns, so Ollama can reuse its KV cache instead of re-prefilling.
+    """
+    messages, start = prepare_messages(prompt, history, session_id)
+    answered = False
+    try:
+        response = await app.state.http.post(
+            f"{ollama_url_for(session_id)}/api/chat",
+            json=chat_payload(model, messages, stream=False)
         )
 
         if response.status_code == 200:
             result = response.json()
-            return result.get("message", {}).get("content", "")
+            content = result.get("message", {}).get("content", "")
+            messages.append({"role": "assistant", "content": content})
+            answered = True
+            return content
         else:
             logger.error(f"Ollama error: {response.status_code} - {response.text}")
             return f"Error: Ollama returned status {response.status_code}"
@@ -183,8 +511,59 @@ def query_ollama(prompt: str, model: str = DEFAULT_OLLAMA_MODEL, history: List[D
     except Exception as e:
         logger.error(f"Failed to query Ollama: {e}")
         return f"Error querying Ollama: {str(e)}"
+    finally:
+        if not answered:
+            del messages[start:]
+
+async def stream_ollama(
+    prompt: str,
+    model: str = DEFAULT_OLLAMA_MODEL,
+    history: List[Dict[str, str]] = None,
+    session_id: Optional[str] = None
+) -> AsyncIterator[str]:
+    """Yield content deltas from Ollama's streaming chat API.
+
+    The turn is only kept in the session once the reply is complete; an HTTP
+    error, client disconnect or cancellation rolls it back.
+    """
+    messages, start = prepare_messages(prompt, history, session_id)
+    reply = []
+    answered = False
+
+    try:
+        async with app.state.http.stream(
+            "POST",
+            f"{ollama_url_for(session_id)}/api/chat",
+            json=chat_payload(model, messages, stream=True)
+        ) as response:
+            response.raise_for_status()
+            async for line in response.aiter_lines():
+                if not line:
+                    continue
+                chunk = json.loads(line)
+                content = chunk.get("message", {}).get("content", "")
+                if content:
+                    reply.append(content)
+                    yield content
+                if chunk.get("done"):
+                    break
+
+        messages.append({"role": "assistant", "content": "".join(reply)})
+        answered = True
+    finally:
+        if not answered:
+            del messages[start:]
 
 # ─── Speech-to-Text (Whisper) ───────────────────────────────────────────────────
+def load_upload_audio(file: UploadFile) -> np.ndarray:
+    """Decode an uploaded audio file into a 16 kHz mono float32 waveform.
+
+    Decodes straight from Starlette's spooled upload file: no ``await file.read()``
+    into a bytes object and no temp-file copy; the ndarray goes directly to Whisper.
+    """
+    file.file.seek(0)
+    return decode_audio(file.file, sampling_rate=TranscriptionScheduler.SAMPLE_RATE)
+
 @app.post("/transcribe", response_model=TranscribeResponse)
 async def transcribe_audio(file: UploadFile = File(...)):
     """Transcribe audio file to text using Whisper"""
@@ -192,18 +571,12 @@ async def transcribe_audio(file: UploadFile = File(...)):
         raise HTTPException(status_code=503, detail="Whisper model not loaded")
 
     try:
-        # Save uploaded file temporarily
-        temp_file = tempfile.NamedTemporaryFile(delete=False, suffix=".wav")
-        content = await file.read()
-        temp_file.write(content)
-        temp_file.close()
+        # Decode upload once, then hand it to the batching scheduler
+        audio = await asyncio.to_thread(load_upload_audio, file)
 
         # Transcribe
         logger.info(f"🎤 Transcribing audio file: {file.filename}")
-        result = whisper_model.transcribe(temp_file.name)
-
-        # Cleanup
-        os.unlink(temp_file.name)
+        result = await transcription_scheduler.transcribe(audio)
 
         return TranscribeResponse(
             text=result["text"].strip(),
@@ -215,34 +588,246 @@ async def transcribe_audio(file: UploadFile = File(...)):
         raise HTTPException(status_code=500, detail=str(e))
 
 # ─── Text-to-Speech (ChatterboxTTS) ─────────────────────────────────────────────
+def compile_tts_decoder(model):
+    """Wrap the T3 transformer forward in torch.compile (reduce-overhead = CUDA graphs)
+
+    Chatterbox drives its own token loop around a HF Llama backbone (``t3.tfmr``),
+    so the per-step forward is what gets compiled; the eager one is kept for fallback.
+    """
+    tfmr = getattr(getattr(model, "t3", None), "tfmr", None)
+    if tfmr is None or not hasattr(torch, "compile"):
+        logger.warning("⚠️  ChatterboxTTS decoder not compilable, running eager")
+        return
+    model._eager_forward = tfmr.forward
+    tfmr.forward = torch.compile(tfmr.forward, mode="reduce-overhead", dynamic=True)
+    logger.info(f"⚡ ChatterboxTTS decoder compiled on {model.device}")
+
+def restore_tts_decoder(model):
+    """Put the eager T3 forward back if the compiled one failed"""
+    eager_forward = getattr(model, "_eager_forward", None)
+    if eager_forward is not None:
+        model.t3.tfmr.forward = eager_forward
+        model._eager_forward = None
+        logger.info(f"↩️  ChatterboxTTS decoder back to eager on {model.device}")
+
+def generate_speech(model, text: str):
+    """Blocking ChatterboxTTS generation under reduced-precision autocast on CUDA
+
+    A compiled decoder that fails (compilation is lazy, so this can be the first
+    real request when warmup is off) is swapped back to eager and the text retried.
+    """
+    use_autocast = TTS_DTYPE != "float32" and str(model.device).startswith("cuda")
+    precision = torch.autocast("cuda", dtype=getattr(torch, TTS_DTYPE)) if use_autocast else nullcontext()
+    try:
+        with precision:
+            # Tuned parameters to prevent hallucination
+            # temperature=0.6 (more stable), cfg_weight=2.5 (follows text closely)
+            audio_array = model.generate(
+                text,
+                temperature=0.6,
+                cfg_weight=2.5,
+                exaggeration=0.5
+            )
+    except Exception as e:
+        if getattr(model, "_eager_forward", None) is None:
+            raise
+        logger.warning(f"⚠️  Compiled ChatterboxTTS decoder failed on {model.device}: {e}")
+        restore_tts_decoder(model)
+        return generate_speech(model, text)
+    # Always hand float32 back to the writers / PCM encoder
+    return audio_array.float() if hasattr(audio_array, "float") else audio_array
+
+async def synthesize(text: str):
+    """Run ChatterboxTTS generation on the next idle instance in the default executor"""
+    model = await tts_pool.get()
+    try:
+        generate = functools.partial(generate_speech, model, text)
+        return await asyncio.get_running_loop().run_in_executor(None, generate)
+    finally:
+        tts_pool.put_nowait(model)
+
+def to_int16(audio_array) -> np.ndarray:
+    """Convert a ChatterboxTTS waveform (tensor or ndarray in [-1, 1]) to mono int16 samples"""
+    if hasattr(audio_array, "detach"):
+        audio_array = audio_array.detach().cpu().numpy()
+    audio = np.clip(np.asarray(audio_array, dtype=np.float32).squeeze(), -1.0, 1.0)
+    return (audio * 32767).astype(np.int16)
+
+def to_pcm16(audio_array) -> bytes:
+    """Convert a ChatterboxTTS waveform to raw int16 PCM bytes"""
+    return to_int16(audio_array).tobytes()
+
+def write_wav(audio_file: Path, audio_array):
+    """Write a 16-bit PCM WAV (blocking). Goes through a temp file so readers never see a partial WAV"""
+    fd, temp_path = tempfile.mkstemp(dir=AUDIO_DIR, suffix=".part")
+    os.close(fd)
+    try:
+        sf.write(temp_path, to_int16(audio_array), TTS_SAMPLE_RATE, format="WAV", subtype="PCM_16")
+        os.replace(temp_path, audio_file)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
+
+async def synthesize_to_file(text: str) -> str:
+    """Synthesize normalized text to a WAV under AUDIO_DIR and return its URL path.
+
+    Files are named by the SHA-256 of the text, so repeated phrases are served
+    from disk without touching the model.
+    """
+    key = hashlib.sha256(text.encode()).hexdigest()
+    audio_file = AUDIO_DIR / f"{key}.wav"
+
+    if audio_file.exists():
+        audio_file.touch()  # keep hot phrases away from the TTL reaper
+        tts_cache[key] = audio_file
+        tts_cache.move_to_end(key)
+        return f"/audio/{key}.wav"
+
+    audio_array = await synthesize(text)
+    await asyncio.to_thread(write_wav, audio_file, audio_array)
+
+    tts_cache[key] = audio_file
+    while len(tts_cache) > AUDIO_CACHE_SIZE:
+        _, evicted = tts_cache.popitem(last=False)
+        evicted.unlink(missing_ok=True)
+    return f"/audio/{key}.wav"
+
+def expire_audio_files(ttl: float) -> List[str]:
+    """Unlink WAVs (and abandoned .part files) under AUDIO_DIR older than ttl seconds"""
+    cutoff = time.time() - ttl
+    expired = []
+    with os.scandir(AUDIO_DIR) as entries:
+        for entry in entries:
+            try:
+                if entry.is_file() and entry.stat().st_mtime < cutoff:
+                    os.unlink(entry.path)
+                    expired.append(entry.name)
+            except FileNotFoundError:
+                pass
+    return expired
+
+async def reap_audio_files():
+    """Background task bounding AUDIO_DIR by age; keeps tts_cache in step with the disk"""
+    while True:
+        await asyncio.sleep(AUDIO_REAP_INTERVAL)
+        try:
+            expired = await asyncio.to_thread(expire_audio_files, AUDIO_TTL_SECONDS)
+        except Exception as e:
+            logger.warning(f"⚠️  Audio cleanup failed: {e}")
+            continue
+        for name in expired:
+            tts_cache.pop(name.removesuffix(".wav"), None)
+        if expired:
+            logger.info(f"🧹 Removed {len(expired)} expired audio files")
+
+SENTENCE_BOUNDARY = re.compile(r"(?<=[.!?])\s+")
+
+# Table-driven equivalent of chatterbox.tts.punc_norm. Replacements that can
+# create a later match (… -> ", " before " - ") stay ordered; the independent
+# single-char substitutions collapse into one str.translate pass.
+PUNC_TABLE = str.maketrans({
+    ";": ", ", "—": "-", "–": "-",
+    "“": '"', "”": '"', "‘": "'", "’": "'",
+})
+SENTENCE_ENDERS = (".", "!", "?", "-", ",")
+
+def fast_punc_norm(text: str) -> str:
+    """Normalize LLM punctuation for ChatterboxTTS (same output as punc_norm)"""
+    if not text:
+        return "You need to add some text for me to talk."
+    if text[0].islower():
+        text = text[0].upper() + text[1:]
+    text = " ".join(text.split())
+    text = text.replace("...", ", ").replace("…", ", ").replace(":", ",").replace(" - ", ", ")
+    text = text.translate(PUNC_TABLE).replace(" ,", ",").rstrip(" ")
+    if not text.endswith(SENTENCE_ENDERS):
+        text += "."
+    return text
+
+def split_sentences(text: str) -> List[str]:
+    """Split text on sentence-ending punctuation"""
+    return [sentence.strip() for sentence in SENTENCE_BOUNDARY.split(text) if sentence.strip()]
+
+def wav_stream_header(sample_rate: int = TTS_SAMPLE_RATE) -> bytes:
+    """WAV header for mono int16 audio of unknown length"""
+    return struct.pack(
+        "<4sI4s4sIHHIIHH4sI",
+        b"RIFF", 0xFFFFFFFF, b"WAVE",
+        b"fmt ", 16, 1, 1, sample_rate, sample_rate * 2, 2, 16,
+        b"data", 0xFFFFFFFF
+    )
+
+async def stream_speech(text: str):
+    """Synthesize text sentence by sentence, yielding a WAV header then PCM chunks"""
+    yield wav_stream_header()
+    for sentence in split_sentences(text):
+        audio_array = await synthesize(fast_punc_norm(sentence))
+        yield to_pcm16(audio_array)
+
+async def stream_chat_speech(
+    prompt: str,
+    model: str,
+    history: List[Dict[str, str]] = None,
+    session_id: Optional[str] = None
+):
+    """Stream an Ollama reply straight into TTS, yielding audio per finished sentence.
+
+    The LLM is read by a separate task which pushes complete sentences onto a
+    per-request queue, so synthesis of one sentence overlaps decoding of the next.
+    """
+    sentences: asyncio.Queue = asyncio.Queue()
+
+    async def read_llm():
+        buffer = ""
+        try:
+            async for delta in stream_ollama(prompt, model, history, session_id):
+                buffer += delta
+                *complete, buffer = SENTENCE_BOUNDARY.split(buffer)
+                for sentence in complete:
+                    if sentence.strip():
+                        sentences.put_nowait(sentence.strip())
+            if buffer.strip():
+                sentences.put_nowait(buffer.strip())
+        finally:
+            sentences.put_nowait(None)
+
+    reader = asyncio.create_task(read_llm())
+    try:
+        yield wav_stream_header()
+        while (sentence := await sentences.get()) is not None:
+            audio_array = await synthesize(fast_punc_norm(sentence))
+            yield to_pcm16(audio_array)
+        await reader
+    finally:
+        # Client disconnected or synthesis failed: stop reading the LLM
+        reader.cancel()
+
+@app.post("/tts/stream")
+async def text_to_speech_stream(request: TTSRequest):
+    """Stream speech as a chunked WAV response, one sentence at a time"""
+    if not tts_models:
+        raise HTTPException(status_code=503, detail="TTS model not loaded")
+
+    logger.info(f"🔊 Streaming speech for: {request.text[:50]}...")
+    return StreamingResponse(stream_speech(request.text), media_type="audio/wav")
+
 @app.post("/tts")
 async def text_to_speech(request: TTSRequest):
     """Convert text to speech using ChatterboxTTS"""
-    if not tts_model:
+    if not tts_models:
         raise HTTPException(status_code=503, detail="TTS model not loaded")
 
     try:
         logger.info(f"🔊 Generating speech for: {request.text[:50]}...")
 
         # Normalize text
-        normalized_text = punc_norm(request.text) if hasattr(tts_model, 'punc_norm') else request.text
-
-        # Generate audio with tuned parameters to prevent hallucination
-        # temperature=0.6 (more stable), cfg_weight=2.5 (follows text closely)
-        audio_array = tts_model.generate(
-            normalized_text,
-            temperature=0.6,
-            cfg_weight=2.5,
-            exaggeration=0.5
-        )
+        normalized_text = fast_punc_norm(request.text)
 
-        # Save to file
-        audio_id = str(uuid.uuid4())
-        audio_path = AUDIO_DIR / f"{audio_id}.wav"
-        sf.write(str(audio_path), audio_array, 24000)
+        # Generate audio (or reuse the cached file for this text)
+        audio_path = await synthesize_to_file(normalized_text)
 
         return {
-            "audio_path": f"/audio/{audio_id}.wav",
+            "audio_path": audio_path,
             "text": request.text
         }
 
@@ -251,6 +836,21 @@ async def text_to_speech(request: TTSRequest):
         raise HTTPException(status_code=500, detail=str(e))
 
 # ─── Chat Endpoint ──────────────────────────────────────────────────────────────
+@app.post("/chat/stream")
+async def chat_stream(request: ChatRequest):
+    """Chat with AI, answering as a streamed WAV response.
+
+    Speech for each sentence is sent while the LLM is still generating the rest.
+    """
+    if not tts_models:
+        raise HTTPException(status_code=503, detail="TTS model not loaded")
+
+    logger.info(f"💬 Streaming chat request: {request.message[:100]}")
+    return StreamingResponse(
+        stream_chat_speech(request.message, request.model, request.history, request.session_id),
+        media_type="audio/wav"
+    )
+
 @app.post("/chat", response_model=ChatResponse)
 async def chat(request: ChatRequest):
     """Chat with AI - returns text and optional audio"""
@@ -258,30 +858,19 @@ async def chat(request: ChatRequest):
         logger.info(f"💬 Chat request: {request.message[:100]}")
 
         # Query Ollama
-        response_text = query_ollama(
+        response_text = await query_ollama(
             prompt=request.message,
             model=request.model,
-            history=request.history
+            history=request.history,
+            session_id=request.session_id
         )
 
         # Generate audio if TTS is available
         audio_path = None
-        if tts_model and response_text:
+        if tts_models and response_text:
             try:
-                normalized_text = punc_norm(response_text)
-                # Tuned params to prevent hallucination
-                audio_array = tts_model.generate(
-                    normalized_text,
-                    temperature=0.6,
-                    cfg_weight=2.5,
-                    exaggeration=0.5
-                )
-
-                audio_id = str(uuid.uuid4())
-                audio_file = AUDIO_DIR / f"{audio_id}.wav"
-                sf.write(str(audio_file), audio_array, 24000)
-
-                audio_path = f"/audio/{audio_id}.wav"
+                normalized_text = fast_punc_norm(response_text)
+                audio_path = await synthesize_to_file(normalized_text)
             except Exception as e:
                 logger.error(f"TTS generation failed: {e}")
 
@@ -299,7 +888,8 @@ async def chat(request: ChatRequest):
 @app.post("/voice-chat")
 async def voice_chat(
     file: UploadFile = File(...),
-    model: str = DEFAULT_OLLAMA_MODEL
+    model: str = DEFAULT_OLLAMA_MODEL,
+    session_id: Optional[str] = None
 ):
     """Voice input -> AI response with voice output"""
     if not whisper_model:
@@ -307,39 +897,23 @@ async def voice_chat(
 
     try:
         # 1. Transcribe audio input
-        temp_file = tempfile.NamedTemporaryFile(delete=False, suffix=".wav")
-        content = await file.read()
-        temp_file.write(content)
-        temp_file.close()
+        audio = await asyncio.to_thread(load_upload_audio, file)
 
         logger.info(f"🎤 Transcribing voice input...")
-        transcription = whisper_model.transcribe(temp_file.name)
+        transcription = await transcription_scheduler.transcribe(audio)
         user_text = transcription["text"].strip()
-        os.unlink(temp_file.name)
 
         logger.info(f"📝 User said: {user_text}")
 
         # 2. Query Ollama
-        response_text = query_ollama(prompt=user_text, model=model)
+        response_text = await query_ollama(prompt=user_text, model=model, session_id=session_id)
 
         # 3. Generate audio response
         audio_path = None
-        if tts_model and response_text:
+        if tts_models and response_text:
             try:
-                normalized_text = punc_norm(response_text)
-                # Tuned params to prevent hallucination
-                audio_array = tts_model.generate(
-                    normalized_text,
-                    temperature=0.6,
-                    cfg_weight=2.5,
-                    exaggeration=0.5
-                )
-
-                audio_id = str(uuid.uuid4())
-                audio_file = AUDIO_DIR / f"{audio_id}.wav"
-                sf.write(str(audio_file), audio_array, 24000)
-
-                audio_path = f"/audio/{audio_id}.wav"
+                normalized_text = fast_punc_norm(response_text)
+                audio_path = await synthesize_to_file(normalized_text)
             except Exception as e:
                 logger.error(f"TTS generation failed: {e}")
 
@@ -368,7 +942,7 @@ async def serve_audio(filename: str):
 async def list_models():
     """List available Ollama models"""
     try:
-        response = requests.get(f"{OLLAMA_URL}/api/tags", timeout=5)
+        response = await app.state.http.get(f"{OLLAMA_URL}/api/tags", timeout=5)
         if response.status_code == 200:
             models = response.json().get("models", [])
             return {"models": [m["name"] for m in models]}
@@ -3,9 +3,10 @@
 set -e
 
 # Entrypoint script for harvis-backend
-# Can run in two modes:
+# Can run in three modes:
 #   1. download-models: Downloads ML models to cache (for init container)
-#   2. app: Runs the main application (default)
+#   2. migrate: Applies the MCP plugin database migration (run by an operator, once)
+#   3. app: Runs the main application (default)
 
 MODE="${1:-app}"
 
@@ -15,15 +16,25 @@ download-models)
   python3 /app/download_models.py
   ;;
 
+migrate)
+  echo "🚀 Running in MIGRATE MODE - applying the MCP plugin migration..."
+  shift
+  # Extra flags go to the migration, e.g. --rebuild-invalid-indexes
+  cd /app && exec python3 -m plugins.core.migration --apply "$@"
+  ;;
+
 app)
   echo "🚀 Running in APP MODE - starting uvicorn server with ${UVICORN_WORKERS:-1} workers..."
   shift
-  exec uvicorn main:app --host 0.0.0.0 --port 8000 --workers "${UVICORN_WORKERS:-1}" "$@"
+  # uvloop event loop + httptools/websockets protocols (all C-backed, from uvicorn[standard]).
+  # No per-message deflate: bridge frames are small and compressing them per socket costs more CPU than it saves.
+  exec uvicorn main:app --host 0.0.0.0 --port 8000 --workers "${UVICORN_WORKERS:-1}" \
+    --loop uvloop --http httptools --ws websockets --ws-per-message-deflate false "$@"
   ;;
 
 *)
   echo "❌ Unknown mode: $MODE"
-  echo "Usage: $0 {download-models|app}"
+  echo "Usage: $0 {download-models|migrate|app}"
   exit 1
   ;;
 esac
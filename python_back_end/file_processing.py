@@ -1,11 +1,32 @@
 import base64
+import codecs
 import io
 import logging
-from typing import Optional
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional, Tuple
 
 # Configure logger
 logger = logging.getLogger(__name__)
 
+# Data-URL headers ("data:<mime>;base64,") are short; never scan the whole payload for the comma
+DATA_URL_HEADER_MAX = 256
+# Plain-text attachments are decoded incrementally and truncated at this many characters
+MAX_TEXT_CHARS = 1_000_000
+TEXT_CHUNK_SIZE = 64 * 1024
+# PDFs with fewer pages than this are extracted in-process; the pool is not worth the startup
+PARALLEL_PDF_MIN_PAGES = 16
+
+_pdf_pool: Optional[ProcessPoolExecutor] = None
+
+def _get_pdf_pool() -> ProcessPoolExecutor:
+    """Lazily create the shared process pool used for large PDFs."""
+    global _pdf_pool
+    if _pdf_pool is None:
+        _pdf_pool = ProcessPoolExecutor(max_workers=os.cpu_count())
+    return _pdf_pool
+
 def extract_text_from_file(file_data: str, file_type: str) -> Optional[str]:
     """
     Extract text from a file based on its type.
@@ -19,21 +40,20 @@ def extract_text_from_file(file_data: str, file_type: str) -> Optional[str]:
     """
     try:
         # Decode base64 data
-        if ',' in file_data:
-            _, encoded = file_data.split(',', 1)
-        else:
-            encoded = file_data
+        comma = file_data.find(',', 0, DATA_URL_HEADER_MAX)
+        encoded = file_data[comma + 1:] if comma != -1 else file_data
             
-        decoded_data = base64.b64decode(encoded)
-        file_bytes = io.BytesIO(decoded_data)
+        decoded_data = base64.b64decode(encoded, validate=False)
+        del encoded  # release the sliced base64 string before parsing
         
         # Determine extraction method based on type
+        # (BytesIO over bytes shares the buffer until written to, so no extra copy)
         if 'pdf' in file_type.lower():
-            return _extract_from_pdf(file_bytes)
+            return _extract_from_pdf(io.BytesIO(decoded_data))
         elif 'word' in file_type.lower() or 'docx' in file_type.lower():
-            return _extract_from_docx(file_bytes)
+            return _extract_from_docx(io.BytesIO(decoded_data))
         elif 'text' in file_type.lower() or 'txt' in file_type.lower() or 'md' in file_type.lower() or 'csv' in file_type.lower():
-            return decoded_data.decode('utf-8', errors='replace')
+            return _decode_text(decoded_data)
         else:
             logger.warning(f"Unsupported file type for text extraction: {file_type}")
             return None
@@ -42,15 +62,77 @@ def extract_text_from_file(file_data: str, file_type: str) -> Optional[str]:
         logger.error(f"Error processing file: {e}")
         return f"[Error extracting text from file: {str(e)}]"
 
+def _decode_text(data: bytes, limit: int = MAX_TEXT_CHARS) -> str:
+    """Decode UTF-8 text in chunks, stopping once ``limit`` characters are produced."""
+    decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+    view = memoryview(data)
+    parts = []
+    size = 0
+    for start in range(0, len(view), TEXT_CHUNK_SIZE):
+        part = decoder.decode(view[start:start + TEXT_CHUNK_SIZE])
+        parts.append(part)
+        size += len(part)
+        if size >= limit:
+            logger.info(f"Text attachment truncated to {limit} characters")
+            return "".join(parts)[:limit]
+    parts.append(decoder.decode(b'', final=True))
+    return "".join(parts)
+
+def _extract_pdf_pages(args: Tuple[str, int, int]) -> str:
+    """Worker: extract text from pages [start, stop) of the PDF at a file path."""
+    import pypdf
+    path, start, stop = args
+    reader = pypdf.PdfReader(path)
+    return "\n".join(reader.pages[i].extract_text() for i in range(start, stop))
+
 def _extract_from_pdf(file_bytes: io.BytesIO) -> str:
-    """Extract text from PDF BytesIO object."""
+    """Extract text from PDF BytesIO object (PDFium when available, pypdf otherwise)."""
+    try:
+        import pypdfium2 as pdfium
+    except ImportError:
+        return _extract_from_pdf_pypdf(file_bytes)
+
+    try:
+        pdf = pdfium.PdfDocument(file_bytes.getvalue())
+        try:
+            text = []
+            for page in pdf:
+                textpage = page.get_textpage()
+                text.append(textpage.get_text_range().replace("\r\n", "\n"))
+                textpage.close()
+                page.close()
+            return "\n".join(text)
+        finally:
+            pdf.close()
+    except Exception as e:
+        # pypdf keeps the original error contract (and may read what PDFium rejects)
+        logger.warning(f"PDFium extraction failed, falling back to pypdf: {e}")
+        file_bytes.seek(0)
+        return _extract_from_pdf_pypdf(file_bytes)
+
+def _extract_from_pdf_pypdf(file_bytes: io.BytesIO) -> str:
+    """Extract text from PDF BytesIO object with pure-Python pypdf."""
     try:
         import pypdf
         reader = pypdf.PdfReader(file_bytes)
-        text = []
-        for page in reader.pages:
-            text.append(page.extract_text())
-        return "\n".join(text)
+        page_count = len(reader.pages)
+        if page_count < PARALLEL_PDF_MIN_PAGES:
+            text = []
+            for page in reader.pages:
+                text.append(page.extract_text())
+            return "\n".join(text)
+
+        # Split pages into one contiguous range per worker; results come back in order.
+        # Workers read the PDF from a temp file, so only the path is pickled per range.
+        with tempfile.NamedTemporaryFile(suffix=".pdf", delete=False) as tmp:
+            tmp.write(file_bytes.getbuffer())
+        try:
+            workers = os.cpu_count() or 1
+            step = -(-page_count // workers)
+            ranges = [(tmp.name, start, min(start + step, page_count)) for start in range(0, page_count, step)]
+            return "\n".join(_get_pdf_pool().map(_extract_pdf_pages, ranges))
+        finally:
+            os.unlink(tmp.name)
     except ImportError:
         logger.error("pypdf is not installed")
         return "[Error: pypdf library is missing]"
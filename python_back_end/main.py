@@ -293,6 +293,16 @@ except ImportError as e:
 # Global RAG retriever (initialized in lifespan)
 local_rag_retriever = None
 
+# ─── OpenClaw / MCP Plugins ───────────────────────────────────────────────────
+try:
+    from plugins.openclaw.routes import router as openclaw_router, bridge_lifespan
+    from plugins.mcp.routes import router as mcp_router
+
+    OPENCLAW_AVAILABLE = True
+except ImportError as e:
+    logging.warning(f"OpenClaw plugins not available: {e}")
+    OPENCLAW_AVAILABLE = False
+
 # ─── Set up logging ─────────────────────────────────────────────────────────────
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -419,7 +429,12 @@ async def lifespan(app: FastAPI):
         logger.error(f"❌ Database connection failed: {e}")
         # Don't exit, allow app to start even if DB fails (will retry)
 
-    yield
+    if OPENCLAW_AVAILABLE:
+        # Bridge background tasks (event persistence, cleanup) share the pool
+        async with bridge_lifespan(getattr(app.state, "pg_pool", None)):
+            yield
+    else:
+        yield
 
     # Shutdown: close connection pool
     if hasattr(app.state, "pg_pool"):
@@ -535,6 +550,11 @@ app.include_router(containers_router)
 if RAG_CORPUS_AVAILABLE:
     app.include_router(rag_router)
 
+# Include OpenClaw / MCP plugin routers
+if OPENCLAW_AVAILABLE:
+    app.include_router(openclaw_router)
+    app.include_router(mcp_router)
+
 # ─── Device & models -----------------------------------------------------------
 device = 0 if torch.cuda.is_available() else -1
 logger.info("Using device: %s", "cuda" if device == 0 else "cpu")
@@ -2,13 +2,29 @@
 MCP Plugin System - Core Event Schema
 
 This module defines the event protocol for the MCP plugin system.
-All events follow the format: { type, job_id, timestamp, payload }
+All events follow the format: { type, job_id, timestamp_ns, payload, timestamp }
+
+timestamp_ns is the event time in integer nanoseconds since the epoch;
+timestamp is the same instant as an ISO datetime, kept for older readers.
+Events from connected VMs are built with Event.from_trusted(), which skips
+Pydantic validation; anything else must go through Event(**data).
 """
 
+import time
 from enum import Enum
-from typing import Any, Dict, List, Optional
-from datetime import datetime
-from pydantic import BaseModel, Field
+from typing import Any, Dict, List, Optional, Union
+from datetime import datetime, timezone
+
+import orjson
+from pydantic import BaseModel, Field, computed_field, model_validator
+
+# orjson handles datetime/UUID/Enum natively; naive datetimes are treated as UTC
+ORJSON_OPTIONS = orjson.OPT_NAIVE_UTC | orjson.OPT_SERIALIZE_NUMPY
+
+
+def json_dumps(obj: Any) -> bytes:
+    """Serialize event data to JSON bytes with orjson."""
+    return orjson.dumps(obj, option=ORJSON_OPTIONS)
 
 
 class EventType(str, Enum):
@@ -58,15 +74,87 @@ class EventType(str, Enum):
 
 
 class Event(BaseModel):
-    """Base event model. All events follow this structure."""
+    """
+    Base event model. All events follow this structure.
+
+    The timestamp is stored as integer nanoseconds since the epoch; the
+    ``timestamp`` datetime is only materialized when the event is serialized.
+    """
 
     type: EventType
     job_id: str
-    timestamp: datetime = Field(default_factory=datetime.utcnow)
+    timestamp_ns: int = Field(default_factory=time.time_ns)
     payload: Dict[str, Any] = Field(default_factory=dict)
 
-    class Config:
-        json_encoders = {datetime: lambda v: v.isoformat()}
+    @model_validator(mode="before")
+    @classmethod
+    def _timestamp_from_wire(cls, data: Any) -> Any:
+        """Accept the wire-format ``timestamp`` (ISO string or datetime) from VMs."""
+        if isinstance(data, dict) and "timestamp" in data and "timestamp_ns" not in data:
+            timestamp_ns = _wire_timestamp_ns(data["timestamp"])
+            if timestamp_ns is not None:
+                data = {**data, "timestamp_ns": timestamp_ns}
+        return data
+
+    @classmethod
+    def from_trusted(cls, data: Dict[str, Any]) -> "Event":
+        """
+        Build an event from an authenticated peer (a connected VM) without
+        running Pydantic validation. Only the event type is coerced and the
+        wire timestamp converted; untrusted input must go through Event(**data).
+
+        Raises ValueError if ``type`` or ``job_id`` is missing or invalid.
+        """
+        try:
+            event_type = EventType(data["type"])
+            job_id = data["job_id"]
+        except (KeyError, TypeError) as e:
+            raise ValueError(f"Malformed event, missing {e}") from None
+        timestamp_ns = data.get("timestamp_ns")
+        if timestamp_ns is None:
+            timestamp_ns = _wire_timestamp_ns(data.get("timestamp"))
+        return cls.model_construct(
+            type=event_type,
+            job_id=job_id,
+            timestamp_ns=timestamp_ns if timestamp_ns is not None else time.time_ns(),
+            payload=data.get("payload") or {},
+        )
+
+    @computed_field
+    @property
+    def timestamp(self) -> datetime:
+        """Event time as a naive UTC datetime."""
+        return datetime.fromtimestamp(
+            self.timestamp_ns / 1_000_000_000, tz=timezone.utc
+        ).replace(tzinfo=None)
+
+    def json_bytes(self) -> bytes:
+        """Serialize the event to JSON bytes via orjson."""
+        # Same shape as model_dump(), without walking the payload through
+        # Pydantic's serializer first; orjson encodes the enum and datetime.
+        try:
+            return json_dumps(
+                {
+                    "type": self.type,
+                    "job_id": self.job_id,
+                    "timestamp_ns": self.timestamp_ns,
+                    "payload": self.payload,
+                    "timestamp": self.timestamp,
+                }
+            )
+        except TypeError:  # Payload holds objects only Pydantic can serialize
+            return json_dumps(self.model_dump(mode="python"))
+
+
+def _wire_timestamp_ns(ts: Any) -> Optional[int]:
+    """Convert a wire timestamp (ISO string or datetime, naive = UTC) to epoch ns."""
+    if isinstance(ts, str):
+        ts = datetime.fromisoformat(ts)
+    if isinstance(ts, datetime):
+        if ts.tzinfo is None:
+            ts = ts.replace(tzinfo=timezone.utc)
+        return int(ts.timestamp() * 1_000_000_000)
+    return None
 
 
 # =============================================================================
@@ -304,9 +392,24 @@ class ContextProvidedPayload(BaseModel):
 # =============================================================================
 
 
-def create_event(event_type: EventType, job_id: str, payload: BaseModel) -> Event:
-    """Factory function to create typed events."""
-    return Event(type=event_type, job_id=job_id, payload=payload.dict())
+def create_event(
+    event_type: EventType, job_id: str, payload: Union[BaseModel, Dict[str, Any]]
+) -> Event:
+    """
+    Factory function to create typed events.
+
+    Payload models are validated when they are built, so the envelope is created
+    with model_construct() and not validated a second time.
+    """
+    if isinstance(payload, BaseModel):
+        data = payload.model_dump(mode="python")
+    elif isinstance(payload, dict):
+        data = payload
+    else:
+        data = payload.dict()  # Legacy duck-typed payload objects
+    return Event.model_construct(
+        type=event_type, job_id=job_id, timestamp_ns=time.time_ns(), payload=data
+    )
 
 
 # Event type to payload model mapping
@@ -5,9 +5,11 @@ Defines the Job model and related schemas for task execution.
 """
 
 from enum import Enum
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, FrozenSet, List, Optional
 from datetime import datetime
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, PrivateAttr
+
+from .events import json_dumps
 
 
 class JobStatus(str, Enum):
@@ -39,11 +41,11 @@ class PolicyProfile(BaseModel):
     name: str
     description: str
 
-    # Auto-allowed tools (no approval needed)
-    auto_allow_tools: List[str] = Field(default_factory=list)
+    # Auto-allowed tools (no approval needed); lists are coerced to frozensets
+    auto_allow_tools: FrozenSet[str] = Field(default_factory=frozenset)
 
     # Tools requiring approval
-    approval_required_tools: List[str] = Field(default_factory=list)
+    approval_required_tools: FrozenSet[str] = Field(default_factory=frozenset)
 
     # Risk-based approval thresholds
     approval_risk_threshold: RiskLevel = RiskLevel.HIGH
@@ -76,6 +78,17 @@ class JobStep(BaseModel):
     screenshots: List[str] = Field(default_factory=list)  # Screenshot IDs
 
 
+# Statuses in which a job holds (or waits for) a VM
+_ACTIVE_STATUSES = frozenset(
+    {JobStatus.QUEUED, JobStatus.VM_BOOTING, JobStatus.RUNNING, JobStatus.PAUSED}
+)
+
+# Reassigning any of these rebuilds Job.task_start_frame()
+_TASK_START_FIELDS = frozenset(
+    {"id", "task_prompt", "policy_profile", "max_runtime_minutes", "steps"}
+)
+
+
 class Job(BaseModel):
     """Core Job model representing an automation task."""
 
@@ -116,8 +129,80 @@ class Job(BaseModel):
     metadata: Dict[str, Any] = Field(default_factory=dict)
     tags: List[str] = Field(default_factory=list)
 
-    class Config:
-        json_encoders = {datetime: lambda v: v.isoformat() if v else None}
+    # Encoded task_start frame for the VM, built once per job
+    _task_start_frame: Optional[bytes] = PrivateAttr(default=None)
+    # Serialized job state, rebuilt after the next field assignment
+    _dict_cache: Optional[Dict[str, Any]] = PrivateAttr(default=None)
+    _initial_state: Optional[bytes] = PrivateAttr(default=None)
+    _artifacts_json: Optional[bytes] = PrivateAttr(default=None)
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        super().__setattr__(name, value)
+        if name.startswith("_"):
+            return
+        self.mark_dirty()
+        if name in _TASK_START_FIELDS:
+            super().__setattr__("_task_start_frame", None)
+
+    def mark_dirty(self) -> None:
+        """Drop cached serializations; call after mutating a list/dict field in place."""
+        super().__setattr__("_dict_cache", None)
+        super().__setattr__("_initial_state", None)
+        super().__setattr__("_artifacts_json", None)
+
+    def cached_dict(self) -> Dict[str, Any]:
+        """model_dump(), cached until the job changes. Treat as read-only."""
+        if self._dict_cache is None:
+            self._dict_cache = self.model_dump()
+        return self._dict_cache
+
+    def initial_state_frame(self) -> bytes:
+        """The initial_state message for new task subscribers, orjson-encoded and cached."""
+        if self._initial_state is None:
+            self._initial_state = json_dumps(
+                {"type": "initial_state", "job": self.cached_dict()}
+            )
+        return self._initial_state
+
+    def task_start_frame(self) -> bytes:
+        """The task_start message sent to the VM, orjson-encoded and cached."""
+        if self._task_start_frame is None:
+            self._task_start_frame = json_dumps(
+                {
+                    "type": "task_start",
+                    "task": {
+                        "id": self.id,
+                        "prompt": self.task_prompt,
+                        "policy": self.policy_profile,
+                        "max_runtime": self.max_runtime_minutes,
+                        "steps": [step.model_dump() for step in self.steps],
+                    },
+                }
+            )
+        return self._task_start_frame
+
+    def artifacts_json(self) -> bytes:
+        """The artifacts list as JSON, orjson-encoded and cached until the job changes."""
+        if self._artifacts_json is None:
+            self._artifacts_json = json_dumps(self.artifacts or [])
+        return self._artifacts_json
+
+    def add_artifact(self, artifact: Dict[str, Any]) -> None:
+        """
+        Append an artifact. Use this rather than artifacts.append(): the cached
+        artifacts JSON is extended in place instead of re-encoded on next read.
+        """
+        self.artifacts.append(artifact)
+        cached = self._artifacts_json
+        super().__setattr__("_dict_cache", None)
+        super().__setattr__("_initial_state", None)
+        if cached is not None:
+            encoded = json_dumps(artifact)
+            if len(self.artifacts) == 1:
+                cached = b"[" + encoded + b"]"
+            else:
+                cached = cached[:-1] + b"," + encoded + b"]"
+        self._artifacts_json = cached
 
     @property
     def duration_seconds(self) -> Optional[float]:
@@ -130,12 +215,7 @@ class Job(BaseModel):
     @property
     def is_active(self) -> bool:
         """Check if job is currently active."""
-        return self.status in [
-            JobStatus.QUEUED,
-            JobStatus.VM_BOOTING,
-            JobStatus.RUNNING,
-            JobStatus.PAUSED,
-        ]
+        return self.status in _ACTIVE_STATUSES
 
     @property
     def progress_percentage(self) -> float:
@@ -157,6 +237,12 @@ class CreateJobRequest(BaseModel):
     metadata: Dict[str, Any] = Field(default_factory=dict)
 
 
+class BatchGetRequest(BaseModel):
+    """Request model for fetching several resources by ID in one call."""
+
+    ids: List[str] = Field(..., min_length=1, max_length=500)
+
+
 class JobResponse(BaseModel):
     """Response model for job operations."""
 
@@ -224,7 +310,7 @@ DEFAULT_POLICY_PROFILES = {
     "default": PolicyProfile(
         name="default",
         description="Balanced security with approval for destructive actions",
-        auto_allow_tools=[
+        auto_allow_tools=frozenset({
             "browser_navigate",
             "browser_click",
             "browser_type",
@@ -232,14 +318,14 @@ DEFAULT_POLICY_PROFILES = {
             "browser_screenshot",
             "search_web",
             "read_file",
-        ],
-        approval_required_tools=[
+        }),
+        approval_required_tools=frozenset({
             "write_file",
             "execute_shell",
             "delete_file",
             "send_message",
             "deploy",
-        ],
+        }),
         approval_risk_threshold=RiskLevel.HIGH,
         max_runtime_minutes=30,
         capture_screenshots=True,
@@ -248,11 +334,11 @@ DEFAULT_POLICY_PROFILES = {
     "strict": PolicyProfile(
         name="strict",
         description="Maximum security - all actions require approval",
-        auto_allow_tools=[
+        auto_allow_tools=frozenset({
             "browser_navigate",
             "browser_screenshot",
-        ],
-        approval_required_tools=[
+        }),
+        approval_required_tools=frozenset({
             "browser_click",
             "browser_type",
             "browser_scroll",
@@ -262,7 +348,7 @@ DEFAULT_POLICY_PROFILES = {
             "execute_shell",
             "delete_file",
             "send_message",
-        ],
+        }),
         approval_risk_threshold=RiskLevel.LOW,
         max_runtime_minutes=15,
         capture_screenshots=True,
@@ -271,7 +357,7 @@ DEFAULT_POLICY_PROFILES = {
     "unattended": PolicyProfile(
         name="unattended",
         description="For trusted automation - minimal approvals",
-        auto_allow_tools=[
+        auto_allow_tools=frozenset({
             "browser_navigate",
             "browser_click",
             "browser_type",
@@ -280,13 +366,13 @@ DEFAULT_POLICY_PROFILES = {
             "search_web",
             "read_file",
             "write_file",
-        ],
-        approval_required_tools=[
+        }),
+        approval_required_tools=frozenset({
             "execute_shell",
             "delete_file",
             "send_message",
             "deploy",
-        ],
+        }),
         approval_risk_threshold=RiskLevel.CRITICAL,
         max_runtime_minutes=60,
         capture_screenshots=True,
@@ -4,15 +4,153 @@ MCP Plugin Registry
 Manages MCP server registrations and tool discovery.
 """
 
+import copy
 import json
 import logging
-from typing import Dict, List, Optional, Any
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Any, Set, Tuple
 from datetime import datetime
 
 from ..core.models import MCPServer, MCPTool
 
 logger = logging.getLogger(__name__)
 
+# (epoch second, "YYYY-MM-DDTHH:MM:SS") of the last formatted timestamp
+_timestamp_second = (0, "1970-01-01T00:00:00")
+
+
+def utc_timestamp() -> str:
+    """
+    Millisecond-precision ISO-8601 UTC timestamp for result envelopes.
+
+    The date/time prefix is formatted once per second and reused, so most
+    calls only format the milliseconds.
+    """
+    global _timestamp_second
+    now = time.time()
+    second = int(now)
+    if second != _timestamp_second[0]:
+        _timestamp_second = (second, time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(second)))
+    return f"{_timestamp_second[1]}.{int((now - second) * 1000):03d}Z"
+
+
+# =============================================================================
+# OpenClaw tool schemas
+# =============================================================================
+# Built once at import and deep-copied into each registered tool (see
+# register_openclaw_server), so a caller editing a tool's parameters cannot
+# change the schema of every other OpenClaw server.
+
+_SELECTOR_PROPERTY = {"type": "string", "description": "CSS selector or XPath"}
+
+_OPENCLAW_NAVIGATE_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "url": {"type": "string", "description": "The URL to navigate to"}
+    },
+    "required": ["url"],
+}
+
+_OPENCLAW_CLICK_SCHEMA = {
+    "type": "object",
+    "properties": {"selector": _SELECTOR_PROPERTY},
+    "required": ["selector"],
+}
+
+_OPENCLAW_TYPE_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "selector": _SELECTOR_PROPERTY,
+        "text": {"type": "string", "description": "Text to type"},
+    },
+    "required": ["selector", "text"],
+}
+
+_OPENCLAW_SCREENSHOT_SCHEMA = {"type": "object", "properties": {}}
+
+_OPENCLAW_EXECUTE_TASK_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "task_description": {
+            "type": "string",
+            "description": "Description of the task to execute",
+        },
+        "steps": {
+            "type": "array",
+            "items": {"type": "string"},
+            "description": "Optional list of steps to follow",
+        },
+    },
+    "required": ["task_description"],
+}
+
+# (id suffix, tool name, description, parameters schema)
+_OPENCLAW_TOOL_SPECS: List[Tuple[str, str, str, Dict[str, Any]]] = [
+    ("navigate", "browser_navigate", "Navigate to a URL in the browser", _OPENCLAW_NAVIGATE_SCHEMA),
+    ("click", "browser_click", "Click on an element", _OPENCLAW_CLICK_SCHEMA),
+    ("type", "browser_type", "Type text into an input field", _OPENCLAW_TYPE_SCHEMA),
+    ("screenshot", "browser_screenshot", "Take a screenshot of the current page", _OPENCLAW_SCREENSHOT_SCHEMA),
+    (
+        "execute_task",
+        "execute_automation_task",
+        "Execute a complex automation task with OpenClaw",
+        _OPENCLAW_EXECUTE_TASK_SCHEMA,
+    ),
+]
+
+
+class _RWLock:
+    """
+    Reader/writer lock: readers share it, writers get it exclusively.
+
+    Waiting writers block new readers so a steady stream of listings
+    cannot starve registration.
+
+    The routes call the registry from the event loop thread, but it is a
+    module-level singleton that sync code (threadpool handlers, to_thread
+    work) may share, and on free-threaded builds there is no GIL to keep
+    the multi-list updates below consistent, hence a thread lock rather
+    than an asyncio one. Registry methods never await, so holding it is
+    always brief.
+    """
+
+    def __init__(self):
+        self._cond = threading.Condition(threading.Lock())
+        self._readers = 0
+        self._writer = False
+        self._writers_waiting = 0
+
+    @contextmanager
+    def read(self):
+        with self._cond:
+            while self._writer or self._writers_waiting:
+                self._cond.wait()
+            self._readers += 1
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._readers -= 1
+                if not self._readers:
+                    self._cond.notify_all()
+
+    @contextmanager
+    def write(self):
+        with self._cond:
+            self._writers_waiting += 1
+            while self._writer or self._readers:
+                self._cond.wait()
+            self._writers_waiting -= 1
+            self._writer = True
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._writer = False
+                self._cond.notify_all()
+
 
 class MCPRegistry:
     """
@@ -25,10 +163,26 @@ class MCPRegistry:
     """
 
     def __init__(self):
-        # In-memory storage (should be backed by database in production)
-        self._servers: Dict[str, MCPServer] = {}
-        self._tools: Dict[str, MCPTool] = {}
-        self._server_tools: Dict[str, List[str]] = {}  # server_id -> [tool_ids]
+        # In-memory storage (should be backed by database in production).
+        # Servers and tools live in dense lists addressed by an int index assigned
+        # at registration; string IDs are only resolved once at the API boundary.
+        # Unregistered slots are set to None and their indices pushed on a free
+        # list, so the next registration refills them and the lists never grow
+        # past the most entries ever registered at once.
+        self._server_id_to_idx: Dict[str, int] = {}
+        self._server_list: List[Optional[MCPServer]] = []
+        self._server_tool_indices: List[List[int]] = []  # server idx -> [tool idx]
+        self._tool_id_to_idx: Dict[str, int] = {}
+        self._tool_list: List[Optional[MCPTool]] = []
+        self._tool_server_idx: List[int] = []  # tool idx -> server idx
+        self._tool_by_server_name: Dict[Tuple[int, str], int] = {}  # (server idx, name) -> tool idx
+        self._servers_by_user: Dict[Optional[int], Set[int]] = {}  # user_id -> {server idx}
+        self._free_server_slots: List[int] = []
+        self._free_tool_slots: List[int] = []
+
+        # Guards all of the above; public methods take it, _-prefixed helpers
+        # expect the caller to hold the write side.
+        self._lock = _RWLock()
 
     # ==========================================================================
     # Server Management
@@ -44,16 +198,31 @@ class MCPRegistry:
         Returns:
             server_id: The assigned server ID
         """
-        self._servers[server.id] = server
-        self._server_tools[server.id] = []
+        with self._lock.write():
+            self._register_server(server)
+
+        return server.id
+
+    def _register_server(self, server: MCPServer) -> None:
+        """Add a server (replacing one with the same ID) and discover its tools."""
+        if server.id in self._server_id_to_idx:
+            self._unregister_server(server.id)
+
+        if self._free_server_slots:
+            idx = self._free_server_slots.pop()
+            self._server_list[idx] = server
+        else:
+            idx = len(self._server_list)
+            self._server_list.append(server)
+            self._server_tool_indices.append([])
+        self._server_id_to_idx[server.id] = idx
+        self._servers_by_user.setdefault(server.user_id, set()).add(idx)
 
         logger.info(f"Registered MCP server: {server.name} (ID: {server.id})")
 
         # Auto-discover tools
         self._discover_tools(server)
 
-        return server.id
-
     def unregister_server(self, server_id: str) -> bool:
         """
         Unregister an MCP server.
@@ -64,26 +233,38 @@ class MCPRegistry:
         Returns:
             True if unregistered, False if not found
         """
-        if server_id not in self._servers:
+        with self._lock.write():
+            return self._unregister_server(server_id)
+
+    def _unregister_server(self, server_id: str) -> bool:
+        """Remove a server and all of its tools."""
+        idx = self._server_id_to_idx.pop(server_id, None)
+        if idx is None:
             return False
 
-        server = self._servers[server_id]
+        server = self._server_list[idx]
 
         # Remove all tools for this server
-        if server_id in self._server_tools:
-            for tool_id in self._server_tools[server_id]:
-                if tool_id in self._tools:
-                    del self._tools[tool_id]
-            del self._server_tools[server_id]
-
-        del self._servers[server_id]
+        for tool_idx in self._server_tool_indices[idx]:
+            tool = self._tool_list[tool_idx]
+            self._tool_list[tool_idx] = None
+            self._tool_id_to_idx.pop(tool.id, None)
+            self._tool_by_server_name.pop((idx, tool.name), None)
+        self._free_tool_slots.extend(self._server_tool_indices[idx])
+        self._server_tool_indices[idx] = []
+
+        self._server_list[idx] = None
+        self._free_server_slots.append(idx)
+        self._servers_by_user.get(server.user_id, set()).discard(idx)
 
         logger.info(f"Unregistered MCP server: {server.name} (ID: {server_id})")
         return True
 
     def get_server(self, server_id: str) -> Optional[MCPServer]:
         """Get a server by ID."""
-        return self._servers.get(server_id)
+        with self._lock.read():
+            idx = self._server_id_to_idx.get(server_id)
+            return None if idx is None else self._server_list[idx]
 
     def list_servers(
         self, user_id: Optional[int] = None, enabled_only: bool = True
@@ -98,15 +279,13 @@ class MCPRegistry:
         Returns:
             List of MCPServer objects
         """
-        servers = self._servers.values()
-
-        if user_id is not None:
-            servers = [s for s in servers if s.user_id == user_id]
+        with self._lock.read():
+            if user_id is not None:
+                servers = (self._server_list[idx] for idx in self._servers_by_user.get(user_id, ()))
+            else:
+                servers = self._server_list
 
-        if enabled_only:
-            servers = [s for s in servers if s.enabled]
-
-        return list(servers)
+            return [s for s in servers if s and (not enabled_only or s.enabled)]
 
     def update_server(
         self, server_id: str, updates: Dict[str, Any]
@@ -121,21 +300,28 @@ class MCPRegistry:
         Returns:
             Updated server or None if not found
         """
-        if server_id not in self._servers:
-            return None
+        with self._lock.write():
+            idx = self._server_id_to_idx.get(server_id)
+            if idx is None:
+                return None
+
+            server = self._server_list[idx]
+            previous_user_id = server.user_id
 
-        server = self._servers[server_id]
+            # Apply updates
+            for key, value in updates.items():
+                if hasattr(server, key):
+                    setattr(server, key, value)
 
-        # Apply updates
-        for key, value in updates.items():
-            if hasattr(server, key):
-                setattr(server, key, value)
+            if server.user_id != previous_user_id:
+                self._servers_by_user.get(previous_user_id, set()).discard(idx)
+                self._servers_by_user.setdefault(server.user_id, set()).add(idx)
 
-        server.updated_at = datetime.utcnow()
+            server.updated_at = datetime.utcnow()
 
-        logger.info(f"Updated MCP server: {server.name} (ID: {server_id})")
+            logger.info(f"Updated MCP server: {server.name} (ID: {server_id})")
 
-        return server
+            return server
 
     # ==========================================================================
     # Tool Management
@@ -158,23 +344,42 @@ class MCPRegistry:
 
         logger.info(f"Tool discovery for {server.name}: Found {len(tools)} tools")
 
-        for tool in tools:
-            self._tools[tool.id] = tool
-            self._server_tools[server.id].append(tool.id)
+        self._add_tools(server.id, tools)
 
         return tools
 
+    def _add_tools(self, server_id: str, tools: List[MCPTool]) -> None:
+        """Store a server's tools and build every tool index in one batch."""
+        server_idx = self._server_id_to_idx[server_id]
+
+        # Refill freed slots first, then append the rest
+        free = self._free_tool_slots
+        reused = min(len(free), len(tools))
+        indices = [free.pop() for _ in range(reused)]
+        for idx, tool in zip(indices, tools):
+            self._tool_list[idx] = tool
+            self._tool_server_idx[idx] = server_idx
+        start = len(self._tool_list)
+        indices.extend(range(start, start + len(tools) - reused))
+        self._tool_list.extend(tools[reused:])
+        self._tool_server_idx.extend([server_idx] * (len(tools) - reused))
+
+        self._server_tool_indices[server_idx].extend(indices)
+        self._tool_id_to_idx.update(zip((t.id for t in tools), indices))
+        self._tool_by_server_name.update(zip(((server_idx, t.name) for t in tools), indices))
+
     def get_tool(self, tool_id: str) -> Optional[MCPTool]:
         """Get a tool by ID."""
-        return self._tools.get(tool_id)
+        with self._lock.read():
+            idx = self._tool_id_to_idx.get(tool_id)
+            return None if idx is None else self._tool_list[idx]
 
     def get_tool_by_name(self, server_id: str, tool_name: str) -> Optional[MCPTool]:
         """Get a tool by server ID and name."""
-        for tool_id in self._server_tools.get(server_id, []):
-            tool = self._tools.get(tool_id)
-            if tool and tool.name == tool_name:
-                return tool
-        return None
+        with self._lock.read():
+            server_idx = self._server_id_to_idx.get(server_id)
+            idx = self._tool_by_server_name.get((server_idx, tool_name))
+            return None if idx is None else self._tool_list[idx]
 
     def list_tools(
         self, server_id: Optional[str] = None, enabled_only: bool = True
@@ -189,16 +394,39 @@ class MCPRegistry:
         Returns:
             List of MCPTool objects
         """
-        if server_id:
-            tool_ids = self._server_tools.get(server_id, [])
-            tools = [self._tools[tid] for tid in tool_ids if tid in self._tools]
-        else:
-            tools = list(self._tools.values())
+        with self._lock.read():
+            if server_id:
+                server_idx = self._server_id_to_idx.get(server_id)
+                if server_idx is None:
+                    return []
+                tools = (self._tool_list[idx] for idx in self._server_tool_indices[server_idx])
+            else:
+                tools = self._tool_list
+
+            return [t for t in tools if t and (not enabled_only or t.enabled)]
+
+    def list_tools_for_user(
+        self, user_id: int, enabled_only: bool = True
+    ) -> List[MCPTool]:
+        """
+        List tools across all of a user's enabled servers in one pass.
 
-        if enabled_only:
-            tools = [t for t in tools if t.enabled]
+        Args:
+            user_id: Owner of the servers
+            enabled_only: Only return enabled tools
 
-        return tools
+        Returns:
+            List of MCPTool objects
+        """
+        with self._lock.read():
+            servers, tools = self._server_list, self._tool_list
+            return [
+                tools[idx]
+                for server_idx in self._servers_by_user.get(user_id, ())
+                if servers[server_idx].enabled
+                for idx in self._server_tool_indices[server_idx]
+                if not enabled_only or tools[idx].enabled
+            ]
 
     def execute_tool(
         self,
@@ -217,11 +445,13 @@ class MCPRegistry:
         Returns:
             Tool execution result
         """
-        tool = self._tools.get(tool_id)
-        if not tool:
-            raise ValueError(f"Tool not found: {tool_id}")
+        with self._lock.read():
+            idx = self._tool_id_to_idx.get(tool_id)
+            if idx is None:
+                raise ValueError(f"Tool not found: {tool_id}")
+            tool = self._tool_list[idx]
+            server = self._server_list[self._tool_server_idx[idx]]
 
-        server = self._servers.get(tool.server_id)
         if not server:
             raise ValueError(f"Server not found for tool: {tool_id}")
 
@@ -238,7 +468,7 @@ class MCPRegistry:
             "tool": tool.name,
             "parameters": parameters,
             "result": "Tool execution not yet implemented",
-            "timestamp": datetime.utcnow().isoformat(),
+            "timestamp": utc_timestamp(),
         }
 
     # ==========================================================================
@@ -263,92 +493,23 @@ class MCPRegistry:
             config={"instance_id": instance_id, "type": "openclaw"},
         )
 
-        self.register_server(server)
+        sid = server.id
 
         # Register OpenClaw tools
         tools = [
             MCPTool(
-                id=f"{server.id}-navigate",
-                server_id=server.id,
-                name="browser_navigate",
-                description="Navigate to a URL in the browser",
-                parameters={
-                    "type": "object",
-                    "properties": {
-                        "url": {
-                            "type": "string",
-                            "description": "The URL to navigate to",
-                        }
-                    },
-                    "required": ["url"],
-                },
-            ),
-            MCPTool(
-                id=f"{server.id}-click",
-                server_id=server.id,
-                name="browser_click",
-                description="Click on an element",
-                parameters={
-                    "type": "object",
-                    "properties": {
-                        "selector": {
-                            "type": "string",
-                            "description": "CSS selector or XPath",
-                        }
-                    },
-                    "required": ["selector"],
-                },
-            ),
-            MCPTool(
-                id=f"{server.id}-type",
-                server_id=server.id,
-                name="browser_type",
-                description="Type text into an input field",
-                parameters={
-                    "type": "object",
-                    "properties": {
-                        "selector": {
-                            "type": "string",
-                            "description": "CSS selector or XPath",
-                        },
-                        "text": {"type": "string", "description": "Text to type"},
-                    },
-                    "required": ["selector", "text"],
-                },
-            ),
-            MCPTool(
-                id=f"{server.id}-screenshot",
-                server_id=server.id,
-                name="browser_screenshot",
-                description="Take a screenshot of the current page",
-                parameters={"type": "object", "properties": {}},
-            ),
-            MCPTool(
-                id=f"{server.id}-execute_task",
-                server_id=server.id,
-                name="execute_automation_task",
-                description="Execute a complex automation task with OpenClaw",
-                parameters={
-                    "type": "object",
-                    "properties": {
-                        "task_description": {
-                            "type": "string",
-                            "description": "Description of the task to execute",
-                        },
-                        "steps": {
-                            "type": "array",
-                            "items": {"type": "string"},
-                            "description": "Optional list of steps to follow",
-                        },
-                    },
-                    "required": ["task_description"],
-                },
-            ),
+                id=f"{sid}-{suffix}",
+                server_id=sid,
+                name=tool_name,
+                description=description,
+                parameters=copy.deepcopy(schema),
+            )
+            for suffix, tool_name, description, schema in _OPENCLAW_TOOL_SPECS
         ]
 
-        for tool in tools:
-            self._tools[tool.id] = tool
-            self._server_tools[server.id].append(tool.id)
+        with self._lock.write():
+            self._register_server(server)
+            self._add_tools(sid, tools)
 
         logger.info(f"Registered OpenClaw server with {len(tools)} tools")
 
@@ -5,13 +5,12 @@ FastAPI routes for MCP server and tool management.
 """
 
 from typing import List, Optional, Any, Dict
-from datetime import datetime
 import uuid
 
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException
 
-from ..core.models import MCPServer, MCPTool
-from .registry import mcp_registry
+from ..core.models import MCPServer
+from .registry import mcp_registry, utc_timestamp
 
 router = APIRouter(prefix="/api/mcp", tags=["mcp"])
 
@@ -138,21 +137,14 @@ async def list_server_tools(
     # TODO: Verify user owns this server
 
     tools = mcp_registry.list_tools(server_id=server_id, enabled_only=enabled_only)
-    return [tool.dict() for tool in tools]
+    return [tool.cached_dict() for tool in tools]
 
 
 @router.get("/tools", response_model=List[dict])
 async def list_all_tools(enabled_only: bool = True, user_id: int = 1):
     """List all available MCP tools."""
-    # Get all servers for user
-    servers = mcp_registry.list_servers(user_id=user_id, enabled_only=True)
-
-    all_tools = []
-    for server in servers:
-        tools = mcp_registry.list_tools(server_id=server.id, enabled_only=enabled_only)
-        all_tools.extend(tools)
-
-    return [tool.dict() for tool in all_tools]
+    tools = mcp_registry.list_tools_for_user(user_id, enabled_only=enabled_only)
+    return [tool.cached_dict() for tool in tools]
 
 
 @router.get("/tools/{tool_id}", response_model=dict)
@@ -165,7 +157,7 @@ async def get_tool(tool_id: str, user_id: int = 1):
 
     # TODO: Verify user owns the server this tool belongs to
 
-    return tool.dict()
+    return tool.cached_dict()
 
 
 # =============================================================================
@@ -212,7 +204,7 @@ async def execute_tool(
             "tool": tool_name,
             "server": server.name,
             "result": result,
-            "timestamp": datetime.utcnow().isoformat(),
+            "timestamp": utc_timestamp(),
         }
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Tool execution failed: {str(e)}")
@@ -242,6 +234,6 @@ async def register_openclaw_server(
         "server_id": server_id,
         "server_name": name,
         "tools_registered": len(tools),
-        "tools": [tool.dict() for tool in tools],
+        "tools": [tool.cached_dict() for tool in tools],
         "message": "OpenClaw registered as MCP server",
     }
@@ -6,60 +6,488 @@ Implements the "phone-home" pattern where VMs connect outbound to Harvis.
 """
 
 import asyncio
-import json
+import heapq
+import itertools
 import logging
-from typing import Dict, Optional, Callable, Set
-from datetime import datetime
+import socket
+import time
+import uuid
+import orjson
+from collections import OrderedDict, deque
+from dataclasses import dataclass
+from typing import Any, Awaitable, Deque, Dict, Iterator, List, Optional, Callable, Set, Tuple, Union
+from datetime import datetime, timezone
 from fastapi import WebSocket, WebSocketDisconnect
 
-from ..core.events import Event, EventType, create_event
+from ..core.events import Event, EventType, create_event, json_dumps
 from ..core.job_schema import Job, JobStatus
+from ..core.migration import (
+    EXPIRE_APPROVALS_SQL,
+    INSERT_EVENTS_SQL,
+    NOTIFY_EVENTS_SQL,
+)
 
 logger = logging.getLogger(__name__)
 
+# Maximum messages buffered per socket before one is dropped; browser
+# subscribers get a tighter bound than VMs
+OUTBOUND_QUEUE_SIZE = 1024
+SUBSCRIBER_QUEUE_SIZE = 256
+
+# High-volume events a slow subscriber can lose first; lifecycle, step and
+# approval events are only dropped once none of these are queued
+DROPPABLE_EVENT_TYPES = frozenset(
+    {EventType.LOG, EventType.STDOUT, EventType.STDERR, EventType.VIDEO_FRAME}
+)
+
+# Subscriber event coalescing: up to this many events per frame, waiting at most this long
+EVENT_BATCH_SIZE = 16
+EVENT_BATCH_WAIT = 0.01
+
+# Finished (terminal-state) jobs kept in memory; active jobs are never evicted
+JOB_CACHE_SIZE = 1000
+
+# Event persistence and relay: up to this many events per INSERT / NOTIFY
+# round-trip, waiting at most this long
+PERSIST_BATCH_SIZE = 200
+PERSIST_BATCH_WAIT = 0.05
+
+# Size of the bridge's own asyncpg pool (start(dsn=...)); one connection is
+# acquired per batch, never per event
+PERSIST_POOL_MIN_SIZE = 10
+PERSIST_POOL_MAX_SIZE = 50
+
+# A VM is considered dead this many seconds after its last message. Dead peers are
+# normally caught first by TCP keepalive (see enable_tcp_keepalive) and surface
+# as a disconnect; this deadline is the backstop for a VM whose socket is up
+# but which stopped responding.
+VM_LIVENESS_TIMEOUT = 60
+VM_LIVENESS_TIMEOUT_NS = VM_LIVENESS_TIMEOUT * 1_000_000_000
+
+# Cross-worker event relay over Postgres LISTEN/NOTIFY. Payloads are the
+# sending bridge's 32-char origin ID followed by the event JSON; NOTIFY caps a
+# payload at 8000 bytes, larger events stay local to the worker that got them.
+EVENT_RELAY_CHANNEL = "openclaw_events"
+EVENT_RELAY_MAX_PAYLOAD = 7900
+
+# A VM socket idle for VM_PING_INTERVAL seconds is pinged; after
+# VM_MAX_MISSED_PINGS unanswered pings it is closed. Auth must arrive within
+# VM_AUTH_TIMEOUT seconds of the connection being accepted.
+VM_PING_INTERVAL = 30
+VM_MAX_MISSED_PINGS = 2
+VM_AUTH_TIMEOUT = 10
+
+# Kernel-level dead-peer detection on VM sockets: first probe after
+# TCP_KEEPIDLE idle seconds, then every TCP_KEEPINTVL, giving up after TCP_KEEPCNT
+TCP_KEEPIDLE = 30
+TCP_KEEPINTVL = 15
+TCP_KEEPCNT = 4
+
+# Unanswered approval/context requests are forgotten after this many seconds
+PENDING_REQUEST_TTL = 3600
+PENDING_REQUEST_TTL_NS = PENDING_REQUEST_TTL * 1_000_000_000
+
+# Overdue approval_gates rows are set to 'timeout' this many per UPDATE
+APPROVAL_EXPIRY_BATCH_SIZE = 500
+
+
+class EncodedEvent:
+    """An event serialized once (orjson) and shared by every socket it is sent to."""
+
+    __slots__ = ("event_json", "frame", "droppable")
+
+    def __init__(self, event: Event) -> None:
+        self.event_json = event.json_bytes().decode()
+        self.frame = f'{{"type":"event","event":{self.event_json}}}'
+        self.droppable = event.type in DROPPABLE_EVENT_TYPES
+
+
+OutboundMessage = Union[dict, EncodedEvent, bytes]  # bytes: a pre-encoded frame
+
+
+async def receive_message(websocket: WebSocket) -> dict:
+    """Receive one JSON message, accepting binary (orjson) or text frames."""
+    message = await websocket.receive()
+    if message["type"] == "websocket.disconnect":
+        raise WebSocketDisconnect(message.get("code", 1000))
+    data = message.get("bytes")
+    if data is None:
+        data = message.get("text", "")
+    return orjson.loads(data)
+
+
+_now_iso: Tuple[int, str] = (0, "")
+
+
+def utc_now_iso() -> str:
+    """
+    datetime.utcnow().isoformat(), recomputed at most once per second.
+    For informational timestamps in replies (welcome, acks), not for timing.
+    """
+    global _now_iso
+    second = int(time.time())
+    if _now_iso[0] != second:
+        _now_iso = (second, datetime.utcnow().isoformat())
+    return _now_iso[1]
+
+
+class JobCache:
+    """
+    Jobs by ID. Active jobs are pinned; finished ones live in a bounded LRU,
+    so a long-running server does not accumulate every job it ever ran.
+
+    Supports the dict operations the bridge and routes use; lookups should go
+    through get() (one hash lookup, refreshes LRU position).
+
+    Not locked or sharded: every access happens on the event loop thread and
+    jobs are only mutated by the state loop, so reads never contend.
+    """
+
+    __slots__ = ("maxsize", "_active", "_finished")
+
+    def __init__(self, maxsize: int = JOB_CACHE_SIZE):
+        self.maxsize = maxsize
+        self._active: Dict[str, Job] = {}
+        self._finished: "OrderedDict[str, Job]" = OrderedDict()
+
+    def get(self, job_id: str, default: Optional[Job] = None) -> Optional[Job]:
+        job = self._active.get(job_id)
+        if job is not None:
+            return job
+        job = self._finished.get(job_id)
+        if job is None:
+            return default
+        self._finished.move_to_end(job_id)
+        return job
+
+    def __setitem__(self, job_id: str, job: Job) -> None:
+        if job.is_active:
+            self._finished.pop(job_id, None)
+            self._active[job_id] = job
+        else:
+            self._active.pop(job_id, None)
+            self._store_finished(job_id, job)
+
+    def settle(self, job_id: str) -> None:
+        """Unpin a job that reached a terminal state, making it evictable."""
+        job = self._active.pop(job_id, None)
+        if job is not None:
+            self._store_finished(job_id, job)
+
+    def _store_finished(self, job_id: str, job: Job) -> None:
+        self._finished[job_id] = job
+        self._finished.move_to_end(job_id)
+        while len(self._finished) > self.maxsize:
+            self._finished.popitem(last=False)
+
+    def __getitem__(self, job_id: str) -> Job:
+        job = self.get(job_id)
+        if job is None:
+            raise KeyError(job_id)
+        return job
+
+    def __contains__(self, job_id: object) -> bool:
+        return job_id in self._active or job_id in self._finished
+
+    def __delitem__(self, job_id: str) -> None:
+        if self._active.pop(job_id, None) is None:
+            del self._finished[job_id]
+
+    def __len__(self) -> int:
+        return len(self._active) + len(self._finished)
+
+    def __iter__(self) -> Iterator[str]:
+        yield from list(self._active)
+        yield from list(self._finished)
+
+    def values(self) -> List[Job]:
+        return [*self._active.values(), *self._finished.values()]
+
+    def items(self) -> List[Tuple[str, Job]]:
+        return [*self._active.items(), *self._finished.items()]
+
+
+# Job state transitions. Every change to jobs / instance_tasks / connection
+# status is one of these, applied in order by the bridge's single state task.
+
+
+@dataclass(slots=True)
+class SubmitJob:
+    job: Job
+    instance_id: Optional[str]
+    done: asyncio.Future  # -> job ID, or the submit error
+
+
+@dataclass(slots=True)
+class CancelJob:
+    job_id: str
+    reason: str
+    done: asyncio.Future  # -> bool
+
+
+@dataclass(slots=True)
+class FinishJob:
+    instance_id: str
+    task_id: str
+    status: JobStatus  # COMPLETED or FAILED
+    details: dict  # VM result or error message
+
+
+@dataclass(slots=True)
+class AddArtifacts:
+    job_id: str
+    artifacts: list  # Reported with a completed step
+
+
+@dataclass(slots=True)
+class ReleaseVM:
+    instance_id: str
+
+
+JobTransition = Union[SubmitJob, CancelJob, FinishJob, AddArtifacts, ReleaseVM]
+
+
+def enable_tcp_keepalive(websocket: WebSocket) -> bool:
+    """
+    Turn on TCP keepalive for the socket under a WebSocket.
+
+    The kernel then detects dead peers without any Python-side polling and the
+    pending receive() fails with a disconnect. Starlette does not expose the
+    transport, so it is reached through the server protocol bound to the ASGI
+    receive callable (uvicorn); returns False where that is not available.
+    """
+    protocol = getattr(getattr(websocket, "_receive", None), "__self__", None)
+    transport = getattr(protocol, "transport", None)
+    sock = transport.get_extra_info("socket") if transport is not None else None
+    if sock is None:
+        return False
+    try:
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+        if hasattr(socket, "TCP_KEEPIDLE"):  # Linux; macOS only has TCP_KEEPALIVE
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_KEEPIDLE, TCP_KEEPIDLE)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_KEEPINTVL, TCP_KEEPINTVL)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_KEEPCNT, TCP_KEEPCNT)
+    except (OSError, AttributeError) as e:
+        logger.debug(f"Could not enable TCP keepalive: {e}")
+        return False
+    return True
+
+
+class OutboundQueue:
+    """
+    Bounded per-socket send queue drained by a single writer task.
+
+    Producers enqueue without awaiting, so a slow socket never stalls the
+    bridge or other sockets. When the queue is full the oldest droppable
+    event (see DROPPABLE_EVENT_TYPES) is dropped, or else the oldest pending
+    message. If a send fails the queue closes and on_close runs.
+
+    Events are queued pre-encoded, and so may be any other frame (bytes);
+    remaining messages are plain dicts encoded with orjson. Frames are text by default, or binary with ``binary=True``
+    (the VM transport). With batch_size > 1, consecutive events arriving
+    within batch_wait seconds are coalesced into one ``event_batch`` frame.
+
+    The writer is the socket's only sender: replies to the peer (such as a
+    pong) are queued here too rather than written to the socket directly.
+    """
+
+    __slots__ = (
+        "websocket",
+        "name",
+        "binary",
+        "batch_size",
+        "batch_wait",
+        "maxsize",
+        "pending",
+        "closed",
+        "_ready",
+        "_on_close",
+        "_writer_task",
+    )
+
+    def __init__(
+        self,
+        websocket: WebSocket,
+        name: str,
+        on_close: Optional[Callable[[], None]] = None,
+        maxsize: int = OUTBOUND_QUEUE_SIZE,
+        batch_size: int = 1,
+        batch_wait: float = EVENT_BATCH_WAIT,
+        binary: bool = False,
+    ) -> None:
+        self.websocket = websocket
+        self.name = name
+        self.binary = binary
+        self.batch_size = batch_size
+        self.batch_wait = batch_wait
+        self.maxsize = maxsize
+        self.pending: Deque[OutboundMessage] = deque()
+        self.closed = False
+        self._ready = asyncio.Event()  # Set while pending is non-empty
+        self._on_close = on_close
+        self._writer_task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        """Start the writer task (requires a running event loop)."""
+        if self._writer_task is None:
+            self._writer_task = asyncio.create_task(self._writer_loop())
+
+    def stop(self) -> None:
+        """Stop writing; anything still queued is discarded."""
+        self.closed = True
+        if self._writer_task:
+            self._writer_task.cancel()
+
+    def put(self, message: OutboundMessage) -> bool:
+        """Queue a message for sending. Returns False if the socket is closed."""
+        if self.closed:
+            return False
+        if len(self.pending) >= self.maxsize:
+            self._drop_one()
+        self.pending.append(message)
+        self._ready.set()
+        return True
+
+    def _drop_one(self) -> None:
+        """Make room in a full queue, shedding telemetry before anything else."""
+        pending = self.pending
+        for i, queued in enumerate(pending):
+            if isinstance(queued, EncodedEvent) and queued.droppable:
+                del pending[i]
+                return
+        pending.popleft()
+        logger.warning(f"Send queue full for {self.name}, dropped oldest message")
+
+    async def _wait_ready(self) -> None:
+        while not self.pending:
+            self._ready.clear()
+            await self._ready.wait()
+
+    async def _collect_events(
+        self, first: EncodedEvent
+    ) -> Tuple[str, Optional[OutboundMessage]]:
+        """Coalesce queued events after ``first``; returns (frame, held-back message)."""
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.batch_wait
+        events = [first.event_json]
+        held = None
+
+        while len(events) < self.batch_size:
+            if not self.pending:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    await asyncio.wait_for(self._wait_ready(), timeout)
+                except asyncio.TimeoutError:
+                    break
+            message = self.pending.popleft()
+            if not isinstance(message, EncodedEvent):
+                held = message
+                break
+            events.append(message.event_json)
+
+        if len(events) == 1:
+            return first.frame, held
+        return f'{{"type":"event_batch","events":[{",".join(events)}]}}', held
+
+    async def _send_frame(self, frame: Union[str, bytes]) -> None:
+        key = "bytes" if isinstance(frame, bytes) else "text"
+        await self.websocket.send({"type": "websocket.send", key: frame})
+
+    async def _writer_loop(self) -> None:
+        held = None
+        try:
+            while True:
+                if held is None:
+                    await self._wait_ready()
+                    message = self.pending.popleft()
+                else:
+                    message, held = held, None
+                if isinstance(message, EncodedEvent):
+                    if self.batch_size > 1:
+                        frame, held = await self._collect_events(message)
+                    else:
+                        frame = message.frame
+                    await self._send_frame(frame.encode() if self.binary else frame)
+                else:
+                    data = message if isinstance(message, bytes) else json_dumps(message)
+                    await self._send_frame(data if self.binary else data.decode())
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Failed to send message to {self.name}: {e}")
+        finally:
+            self.closed = True
+            if self._on_close:
+                self._on_close()
+
 
 class VMConnection:
     """Represents a connected VM instance."""
 
+    # One per VM; slots keep thousands of connections free of per-instance dicts
+    __slots__ = (
+        "instance_id",
+        "websocket",
+        "bridge_token",
+        "user_id",
+        "connected_at_ns",
+        "last_ping_ns",
+        "status",
+        "current_task_id",
+        "message_handlers",
+        "outbound",
+    )
+
     def __init__(
         self, instance_id: str, websocket: WebSocket, bridge_token: str, user_id: int
-    ):
+    ) -> None:
         self.instance_id = instance_id
         self.websocket = websocket
         self.bridge_token = bridge_token
         self.user_id = user_id
-        self.connected_at = datetime.utcnow()
-        self.last_ping = datetime.utcnow()
+        # Wall-clock connect time, formatted only when asked for
+        self.connected_at_ns = time.time_ns()
+        # Last message from the VM, for liveness only; monotonic, immune to clock jumps
+        self.last_ping_ns = time.monotonic_ns()
         self.status = "online"
         self.current_task_id: Optional[str] = None
         self.message_handlers: Dict[str, Callable] = {}
+        self.outbound = OutboundQueue(
+            websocket, f"VM {instance_id}", on_close=self._mark_offline, binary=True
+        )
 
-    async def send(self, message: dict):
-        """Send a message to the VM."""
-        try:
-            await self.websocket.send_json(message)
-        except Exception as e:
-            logger.error(f"Failed to send message to VM {self.instance_id}: {e}")
-            raise
+    def _mark_offline(self) -> None:
+        self.status = "offline"
 
-    async def send_event(self, event: Event):
-        """Send an event to the VM."""
-        await self.send({"type": "event", "event": event.dict()})
+    def send(self, message: OutboundMessage) -> bool:
+        """Queue a message for the VM. Returns False if the connection is closed."""
+        return self.outbound.put(message)
 
-    async def ping(self):
-        """Send ping to check connection."""
-        try:
-            await self.websocket.send_json({"type": "ping"})
-            self.last_ping = datetime.utcnow()
-        except Exception:
-            self.status = "offline"
+    def send_event(self, event: Event) -> bool:
+        """Queue an event for the VM."""
+        return self.outbound.put(EncodedEvent(event))
+
+    def ping(self) -> bool:
+        """Queue a ping; liveness is renewed by the pong, as by any VM message."""
+        return self.send({"type": "ping"})
+
+    @property
+    def connected_at(self) -> datetime:
+        """UTC time the VM connected."""
+        return datetime.utcfromtimestamp(self.connected_at_ns / 1_000_000_000)
+
+    @property
+    def expires_at_ns(self) -> int:
+        """Monotonic time (ns) after which the connection counts as dead."""
+        return self.last_ping_ns + VM_LIVENESS_TIMEOUT_NS
 
     def is_alive(self) -> bool:
-        """Check if connection is still alive."""
-        if self.status != "online":
+        """Check if connection is still alive (a busy VM is alive)."""
+        if self.status == "offline":
             return False
-        # Timeout after 60 seconds without ping
-        return (datetime.utcnow() - self.last_ping).total_seconds() < 60
+        return time.monotonic_ns() < self.expires_at_ns
 
 
 class OpenClawBridge:
@@ -73,72 +501,230 @@ class OpenClawBridge:
     4. Handles approval gates and context requests
     """
 
-    def __init__(self):
+    def __init__(self, job_cache_size: int = JOB_CACHE_SIZE) -> None:
         # VM connections: instance_id -> VMConnection
         self.connections: Dict[str, VMConnection] = {}
 
         # Job management
-        self.jobs: Dict[str, Job] = {}
-        self.job_queues: Dict[str, asyncio.Queue] = {}  # instance_id -> Queue
+        self.jobs = JobCache(job_cache_size)
+
+        # Single writer for job state: transitions are queued and applied in order
+        self._state_events: asyncio.Queue = asyncio.Queue()
+        self._state_task: Optional[asyncio.Task] = None
 
-        # Event subscribers: job_id -> Set[WebSocket]
-        self.event_subscribers: Dict[str, Set[WebSocket]] = {}
+        # Event subscribers: job_id -> send queues, one queue per WebSocket shared
+        # by all the jobs it follows; reverse index WebSocket -> subscribed job_ids
+        self.event_subscribers: Dict[str, List[OutboundQueue]] = {}
+        self._subscriber_queues: Dict[WebSocket, OutboundQueue] = {}
+        self._ws_to_jobs: Dict[WebSocket, Set[str]] = {}
 
         # Active tasks tracking
         self.instance_tasks: Dict[str, str] = {}  # instance_id -> task_id
 
+        # Liveness deadlines: heap of (expires_at_ns, seq, instance_id). Entries whose
+        # seq no longer matches _expiry_seq[instance_id] are stale and skipped.
+        self._expiry_heap: List[Tuple[int, int, str]] = []
+        self._expiry_seq: Dict[str, int] = {}
+        self._expiry_counter = itertools.count()
+
+        # Open approval/context requests: request_id -> (job_id, monotonic deadline ns)
+        self._pending_requests: Dict[str, Tuple[str, int]] = {}
+
         # Background tasks
         self._cleanup_task: Optional[asyncio.Task] = None
         self._running = False
 
+        # Event persistence (asyncpg pool, set in start())
+        self.db_pool: Optional[Any] = None
+        self._owns_db_pool = False
+        self._persist_queue: asyncio.Queue = asyncio.Queue()
+        self._persist_task: Optional[asyncio.Task] = None
+
+        # Event relay between workers (dedicated LISTEN connection, set in start()).
+        # Every broadcast event is published, batched by its own task.
+        self._origin = uuid.uuid4().hex
+        self._relay_conn: Optional[Any] = None
+        self._relay_queue: asyncio.Queue = asyncio.Queue()
+        self._relay_task: Optional[asyncio.Task] = None
+
         # Callbacks
         self._event_callbacks: Dict[EventType, list] = {}
         self._approval_callbacks: list = []
         self._context_callbacks: list = []
 
-    async def start(self):
-        """Start the bridge."""
+    async def start(
+        self,
+        db_pool: Optional[Any] = None,
+        dsn: Optional[str] = None,
+        relay_events: bool = False,
+    ) -> None:
+        """
+        Start the bridge.
+
+        VM events are persisted when a database is available: either a shared
+        asyncpg pool (db_pool), or a dsn from which the bridge creates and
+        later closes a pool of its own.
+
+        With relay_events (for several uvicorn workers), every event this
+        worker broadcasts (VM events, job lifecycle and approval events) is
+        also published over Postgres NOTIFY, and events published by the other
+        workers are delivered to this worker's subscribers. Job state and VM
+        connections stay per worker.
+        """
         self._running = True
+        if db_pool is None and dsn:
+            import asyncpg
+
+            db_pool = await asyncpg.create_pool(
+                dsn=dsn,
+                min_size=PERSIST_POOL_MIN_SIZE,
+                max_size=PERSIST_POOL_MAX_SIZE,
+                command_timeout=30,
+            )
+            self._owns_db_pool = True
+        self.db_pool = db_pool
         self._cleanup_task = asyncio.create_task(self._cleanup_loop())
+        if db_pool is not None:
+            if relay_events:
+                self._relay_conn = await db_pool.acquire()
+                await self._relay_conn.add_listener(
+                    EVENT_RELAY_CHANNEL, self._on_relayed_event
+                )
+                self._relay_task = asyncio.create_task(
+                    self._batch_loop(self._relay_queue, self._relay_events, "relay")
+                )
+            self._persist_task = asyncio.create_task(
+                self._batch_loop(self._persist_queue, self._persist_events, "persist")
+            )
+        self._start_state_loop()
         logger.info("OpenClaw Bridge started")
 
-    async def stop(self):
+    async def stop(self) -> None:
         """Stop the bridge."""
         self._running = False
         if self._cleanup_task:
             self._cleanup_task.cancel()
-
-        # Close all connections
-        for conn in self.connections.values():
+        # Drain rather than cancel: the sentinel lets each loop write out the
+        # batch in flight and everything queued before it
+        if self._persist_task:
+            persist_task, self._persist_task = self._persist_task, None
+            self._persist_queue.put_nowait(None)
+            await persist_task
+        if self._relay_task:
+            relay_task, self._relay_task = self._relay_task, None
+            self._relay_queue.put_nowait(None)
+            await relay_task
+        if self._relay_conn is not None:
+            relay_conn, self._relay_conn = self._relay_conn, None
             try:
-                await conn.websocket.close()
-            except:
-                pass
-
+                await relay_conn.remove_listener(
+                    EVENT_RELAY_CHANNEL, self._on_relayed_event
+                )
+            finally:
+                await self.db_pool.release(relay_conn)
+        if self._owns_db_pool:
+            await self.db_pool.close()
+            self.db_pool = None
+            self._owns_db_pool = False
+        if self._state_task:
+            self._state_task.cancel()
+            self._state_task = None
+
+        # Close all connections concurrently, so one stuck socket does not
+        # hold up the rest
+        connections = list(self.connections.values())
         self.connections.clear()
+        for conn in connections:
+            conn.outbound.stop()
+        await asyncio.gather(
+            *(conn.websocket.close() for conn in connections),
+            return_exceptions=True,
+        )
         logger.info("OpenClaw Bridge stopped")
 
-    async def _cleanup_loop(self):
-        """Periodic cleanup of dead connections."""
+    async def _cleanup_loop(self) -> None:
+        """Periodic cleanup of dead connections and expired approval requests."""
         while self._running:
             try:
                 await asyncio.sleep(30)  # Check every 30 seconds
 
-                dead_connections = [
-                    instance_id
-                    for instance_id, conn in self.connections.items()
-                    if not conn.is_alive()
-                ]
-
-                for instance_id in dead_connections:
+                dead = self._pop_expired_connections()
+                for instance_id in dead:
                     logger.info(f"Removing dead connection: {instance_id}")
-                    await self.disconnect_vm(instance_id)
+                await asyncio.gather(
+                    *(self.disconnect_vm(instance_id) for instance_id in dead)
+                )
+
+                self._expire_pending_requests()
+                if self.db_pool is not None:
+                    await self._expire_approval_gates()
 
             except asyncio.CancelledError:
                 break
             except Exception as e:
                 logger.error(f"Cleanup loop error: {e}")
 
+    def _schedule_expiry(self, connection: VMConnection) -> None:
+        """(Re)arm the liveness deadline of a connection."""
+        seq = next(self._expiry_counter)
+        self._expiry_seq[connection.instance_id] = seq
+        heapq.heappush(
+            self._expiry_heap, (connection.expires_at_ns, seq, connection.instance_id)
+        )
+
+    def _pop_expired_connections(self) -> List[str]:
+        """Pop every heap entry past its deadline; returns instance IDs that are dead."""
+        now = time.monotonic_ns()
+        heap = self._expiry_heap
+        dead = []
+        while heap and heap[0][0] <= now:
+            _, seq, instance_id = heapq.heappop(heap)
+            if self._expiry_seq.get(instance_id) != seq:
+                continue  # Superseded by a re-arm or a reconnect
+            connection = self.connections.get(instance_id)
+            if connection is None:
+                continue
+            if connection.is_alive():
+                # Heard from since this deadline was set: re-arm from the last message
+                self._schedule_expiry(connection)
+            else:
+                dead.append(instance_id)
+        return dead
+
+    def record_activity(self, connection: VMConnection) -> None:
+        """
+        Mark a VM as alive: called for every message it sends, so a VM busy
+        streaming events never needs to answer a ping. Only the timestamp is
+        updated; the heap deadline is re-armed lazily when it comes due.
+        """
+        connection.last_ping_ns = time.monotonic_ns()
+
+    def _expire_pending_requests(self) -> None:
+        """Drop approval/context requests that were never answered."""
+        now = time.monotonic_ns()
+        expired = [
+            request_id
+            for request_id, (_, deadline) in self._pending_requests.items()
+            if deadline <= now
+        ]
+        for request_id in expired:
+            del self._pending_requests[request_id]
+        if expired:
+            logger.debug(f"Expired {len(expired)} unanswered requests")
+
+    async def _expire_approval_gates(self) -> int:
+        """Set overdue pending approval gates to 'timeout', one batch at a time."""
+        total = 0
+        async with self.db_pool.acquire() as conn:
+            while True:
+                rows = await conn.fetch(EXPIRE_APPROVALS_SQL, APPROVAL_EXPIRY_BATCH_SIZE)
+                total += len(rows)
+                if len(rows) < APPROVAL_EXPIRY_BATCH_SIZE:
+                    break
+        if total:
+            logger.info(f"Timed out {total} unanswered approval gates")
+        return total
+
     # ==========================================================================
     # VM Connection Management
     # ==========================================================================
@@ -147,11 +733,12 @@ class OpenClawBridge:
         self, websocket: WebSocket, instance_id: str, bridge_token: str, user_id: int
     ) -> VMConnection:
         """
-        Accept a connection from a VM instance.
+        Register a connection from a VM instance (already accepted and authenticated).
 
         This is the "phone-home" entry point where VMs connect to Harvis.
         """
-        await websocket.accept()
+        if not enable_tcp_keepalive(websocket):
+            logger.debug(f"TCP keepalive unavailable for {instance_id}")
 
         # Check if instance already connected
         if instance_id in self.connections:
@@ -167,98 +754,75 @@ class OpenClawBridge:
         )
 
         self.connections[instance_id] = connection
+        connection.outbound.start()
+        self._schedule_expiry(connection)
 
         # Send welcome message
-        await connection.send(
+        connection.send(
             {
                 "type": "connected",
                 "instance_id": instance_id,
-                "timestamp": datetime.utcnow().isoformat(),
+                "timestamp": utc_now_iso(),
             }
         )
 
         logger.info(f"VM connected: {instance_id} (user {user_id})")
 
-        # Start message handler
-        asyncio.create_task(self._handle_vm_messages(connection))
-
+        # The caller stays the socket's only reader and hands each message
+        # to handle_vm_message()
         return connection
 
-    async def disconnect_vm(self, instance_id: str):
+    async def disconnect_vm(self, instance_id: str) -> None:
         """Disconnect a VM."""
-        if instance_id not in self.connections:
+        connection = self.connections.pop(instance_id, None)
+        if connection is None:
             return
 
-        connection = self.connections[instance_id]
+        connection.outbound.stop()
+        self._expiry_seq.pop(instance_id, None)
+
+        # Release any active task
+        self._transition(ReleaseVM(instance_id))
 
         try:
             await connection.websocket.close()
         except:
             pass
 
-        del self.connections[instance_id]
-
-        # Release any active task
-        if instance_id in self.instance_tasks:
-            task_id = self.instance_tasks[instance_id]
-            if task_id in self.jobs:
-                job = self.jobs[task_id]
-                if job.is_active:
-                    job.status = JobStatus.FAILED
-                    job.error_message = "VM disconnected unexpectedly"
-                    job.completed_at = datetime.utcnow()
-                    await self._broadcast_event(
-                        task_id,
-                        Event(
-                            type=EventType.JOB_FAILED,
-                            job_id=task_id,
-                            payload={
-                                "error_message": "VM disconnected unexpectedly",
-                                "duration_seconds": job.duration_seconds,
-                            },
-                        ),
-                    )
-            del self.instance_tasks[instance_id]
-
         logger.info(f"VM disconnected: {instance_id}")
 
-    async def _handle_vm_messages(self, connection: VMConnection):
-        """Handle incoming messages from a VM."""
-        try:
-            while True:
-                message = await connection.websocket.receive_json()
-                await self._process_vm_message(connection, message)
-        except WebSocketDisconnect:
-            logger.info(f"VM {connection.instance_id} disconnected")
-            await self.disconnect_vm(connection.instance_id)
-        except Exception as e:
-            logger.error(f"Error handling VM message: {e}")
-            await self.disconnect_vm(connection.instance_id)
-
-    async def _process_vm_message(self, connection: VMConnection, message: dict):
+    async def handle_vm_message(
+        self, connection: VMConnection, message: Dict[str, Any]
+    ) -> None:
         """Process a message from a VM."""
         msg_type = message.get("type")
 
-        if msg_type == "pong":
-            connection.last_ping = datetime.utcnow()
-
-        elif msg_type == "event":
+        # Ordered by frequency: events dominate VM traffic
+        if msg_type == "event":
             # VM is sending us an event
             event_data = message.get("event", {})
-            event = Event(**event_data)
+            # Authenticated VM: skip full validation on this hot path
+            event = Event.from_trusted(event_data)
             await self._handle_vm_event(connection, event)
 
+        elif msg_type == "pong":
+            self.record_activity(connection)
+
         elif msg_type == "task_complete":
             # Task completed
             task_id = message.get("task_id")
             result = message.get("result")
-            await self._handle_task_complete(connection, task_id, result)
+            self._transition(
+                FinishJob(connection.instance_id, task_id, JobStatus.COMPLETED, result)
+            )
 
         elif msg_type == "task_failed":
             # Task failed
             task_id = message.get("task_id")
             error = message.get("error")
-            await self._handle_task_failed(connection, task_id, error)
+            self._transition(
+                FinishJob(connection.instance_id, task_id, JobStatus.FAILED, error)
+            )
 
         elif msg_type == "needs_approval":
             # VM needs approval for an action
@@ -271,26 +835,117 @@ class OpenClawBridge:
         else:
             logger.warning(f"Unknown message type from VM: {msg_type}")
 
-    async def _handle_vm_event(self, connection: VMConnection, event: Event):
+    async def _handle_vm_event(self, connection: VMConnection, event: Event) -> None:
         """Handle an event from a VM."""
-        # Broadcast to subscribers
-        await self._broadcast_event(event.job_id, event)
+        # Broadcast to subscribers (on every worker)
+        self._publish_event(event.job_id, event)
+
+        # Record step artifacts on the job as they arrive
+        if event.type == EventType.TASK_STEP_COMPLETED:
+            artifacts = event.payload.get("artifacts")
+            if artifacts:
+                self._transition(AddArtifacts(event.job_id, artifacts))
 
-        # Store in database (async)
-        asyncio.create_task(self._persist_event(event))
+        # Store in database (batched by _persist_loop)
+        if self._persist_task is not None:
+            self._persist_queue.put_nowait(event)
 
         # Trigger callbacks
-        if event.type in self._event_callbacks:
-            for callback in self._event_callbacks[event.type]:
+        callbacks = self._event_callbacks.get(event.type)
+        if callbacks:
+            await self._run_callbacks(callbacks, event, "Event")
+
+    async def _batch_loop(
+        self,
+        queue: asyncio.Queue,
+        write: Callable[[List[Event]], Awaitable[None]],
+        what: str,
+    ) -> None:
+        """
+        Drain an event queue, handing events to ``write`` in batches. Returns
+        after writing everything queued before a None sentinel (see stop()).
+        """
+        loop = asyncio.get_running_loop()
+        stopping = False
+        while not stopping:
+            event = await queue.get()
+            if event is None:
+                return
+            batch = [event]
+            deadline = loop.time() + PERSIST_BATCH_WAIT
+            while len(batch) < PERSIST_BATCH_SIZE:
                 try:
-                    await callback(event)
-                except Exception as e:
-                    logger.error(f"Event callback error: {e}")
+                    event = queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    timeout = deadline - loop.time()
+                    if timeout <= 0:
+                        break
+                    try:
+                        event = await asyncio.wait_for(queue.get(), timeout)
+                    except asyncio.TimeoutError:
+                        break
+                if event is None:
+                    stopping = True
+                    break
+                batch.append(event)
 
-    async def _persist_event(self, event: Event):
-        """Persist event to database."""
-        # TODO: Implement database persistence
-        pass
+            try:
+                await write(batch)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Failed to {what} {len(batch)} events: {e}")
+
+    async def _persist_events(self, events: List[Event]) -> None:
+        """Insert a batch of events in a single statement."""
+        task_ids, event_types, payloads, created_ats = [], [], [], []
+        for event in events:
+            try:
+                task_id = uuid.UUID(event.job_id)
+            except (TypeError, ValueError):
+                continue  # Not a persisted task
+            task_ids.append(task_id)
+            event_types.append(event.type.value)
+            payloads.append(json_dumps(event.payload).decode())
+            # Aware UTC: asyncpg reads a naive datetime as server-local time
+            created_ats.append(
+                datetime.fromtimestamp(event.timestamp_ns / 1_000_000_000, timezone.utc)
+            )
+
+        if not task_ids:
+            return
+        async with self.db_pool.acquire() as conn:
+            await conn.execute(
+                INSERT_EVENTS_SQL, task_ids, event_types, payloads, created_ats
+            )
+
+    async def _relay_events(self, events: List[Event]) -> None:
+        """Publish a batch of events to the other workers."""
+        notifications = []
+        for event in events:
+            data = event.json_bytes()
+            if len(data) + len(self._origin) <= EVENT_RELAY_MAX_PAYLOAD:
+                notifications.append(self._origin + data.decode())
+            else:
+                logger.debug(f"Event too large to relay for job {event.job_id}")
+        if notifications:
+            async with self.db_pool.acquire() as conn:
+                await conn.execute(
+                    NOTIFY_EVENTS_SQL, EVENT_RELAY_CHANNEL, notifications
+                )
+
+    def _on_relayed_event(
+        self, connection: Any, pid: int, channel: str, payload: str
+    ) -> None:
+        """asyncpg listener: deliver another worker's event to local subscribers."""
+        if not self.event_subscribers or payload.startswith(self._origin):
+            return
+        try:
+            event = Event.from_trusted(orjson.loads(payload[32:]))
+        except ValueError as e:
+            logger.warning(f"Dropping malformed relayed event: {e}")
+            return
+        self._broadcast_event(event.job_id, event)
 
     # ==========================================================================
     # Task Management
@@ -300,6 +955,11 @@ class OpenClawBridge:
         """
         Submit a new job for execution.
 
+        Returns as soon as the state loop has applied the submission. No VM
+        I/O is awaited: the task_start frame goes on the VM's send queue, so
+        callers can await this on the request path and still surface
+        "No VM instances available" synchronously.
+
         Args:
             job: The job to execute
             instance_id: Specific VM to use (optional, auto-assigns if not provided)
@@ -307,437 +967,528 @@ class OpenClawBridge:
         Returns:
             job_id: The assigned job ID
         """
-        # Store job
-        self.jobs[job.id] = job
-        job.status = JobStatus.QUEUED
+        done = asyncio.get_running_loop().create_future()
+        self._transition(SubmitJob(job, instance_id, done))
+        return await done
 
-        # Find available instance if not specified
-        if not instance_id:
-            instance_id = await self._find_available_instance()
+    async def cancel_job(self, job_id: str, reason: str = "User cancelled") -> bool:
+        """Cancel a running job."""
+        done = asyncio.get_running_loop().create_future()
+        self._transition(CancelJob(job_id, reason, done))
+        return await done
+
+    # --------------------------------------------------------------------------
+    # State task: the only code that mutates jobs, instance_tasks and
+    # connection status. Handlers are synchronous, so each transition is
+    # applied atomically with no await between its reads and writes.
+    # --------------------------------------------------------------------------
+
+    def _start_state_loop(self) -> None:
+        """Start the state task if it is not running yet."""
+        if self._state_task is None:
+            self._state_task = asyncio.create_task(self._state_loop())
+
+    def _transition(self, transition: JobTransition) -> None:
+        """Queue a state transition (started here if start() was not called)."""
+        self._start_state_loop()
+        self._state_events.put_nowait(transition)
+
+    async def _state_loop(self) -> None:
+        while True:
+            transition = await self._state_events.get()
+            try:
+                self._apply(transition)
+            except Exception as e:
+                logger.error(f"Failed to apply {type(transition).__name__}: {e}")
+                done = getattr(transition, "done", None)
+                if done is not None and not done.done():
+                    done.set_exception(e)
+
+    def _apply(self, transition: JobTransition) -> None:
+        if isinstance(transition, FinishJob):
+            self._finish_job(transition)
+        elif isinstance(transition, SubmitJob):
+            transition.done.set_result(
+                self._submit_job(transition.job, transition.instance_id)
+            )
+        elif isinstance(transition, CancelJob):
+            transition.done.set_result(
+                self._cancel_job(transition.job_id, transition.reason)
+            )
+        elif isinstance(transition, AddArtifacts):
+            self._add_artifacts(transition)
+        elif isinstance(transition, ReleaseVM):
+            self._release_vm(transition.instance_id)
 
+    def _submit_job(self, job: Job, instance_id: Optional[str]) -> str:
+        # Find available instance if not specified
         if not instance_id:
-            raise Exception("No VM instances available")
+            instance_id = self._find_available_instance()
+            if not instance_id:
+                raise Exception("No VM instances available")
+        elif instance_id not in self.connections:
+            # Nothing would ever start the job: queued jobs are not
+            # dispatched when a VM connects later
+            raise Exception(f"VM instance {instance_id} is not connected")
+        elif instance_id in self.instance_tasks:
+            raise Exception(f"VM instance {instance_id} is busy")
+
+        # Store job (pinned in the cache while active)
+        job.status = JobStatus.QUEUED
+        self.jobs[job.id] = job
 
         job.vm_id = instance_id
-
-        # Create queue for this job
-        self.job_queues[job.id] = asyncio.Queue()
-
-        # Queue the job
-        await self.job_queues[job.id].put(job)
+        job.task_start_frame()  # Encode the VM task once, up front
 
         # Notify subscribers
-        await self._broadcast_event(
+        self._maybe_broadcast(
             job.id,
-            create_event(
-                EventType.JOB_QUEUED,
-                job.id,
-                # Use dict for payload instead of model to avoid type issues
-                type(
-                    "Payload",
-                    (),
-                    {
-                        "dict": lambda self: {
-                            "task_prompt": job.task_prompt,
-                            "vm_id": job.vm_id,
-                            "policy_profile": job.policy_profile,
-                            "max_runtime_minutes": job.max_runtime_minutes,
-                        }
-                    },
-                )(),
-            ),
+            EventType.JOB_QUEUED,
+            lambda: {
+                "task_prompt": job.task_prompt,
+                "vm_id": job.vm_id,
+                "policy_profile": job.policy_profile,
+                "max_runtime_minutes": job.max_runtime_minutes,
+            },
         )
 
         logger.info(f"Job {job.id} submitted for instance {instance_id}")
 
-        # Try to start immediately if VM is online
-        asyncio.create_task(self._try_start_job(job.id))
-
+        # Start immediately if the VM is online
+        self._start_job(job)
         return job.id
 
-    async def _find_available_instance(self) -> Optional[str]:
+    def _find_available_instance(self) -> Optional[str]:
         """Find an available VM instance."""
         for instance_id, connection in self.connections.items():
             if connection.status == "online" and instance_id not in self.instance_tasks:
                 return instance_id
         return None
 
-    async def _try_start_job(self, job_id: str):
-        """Try to start a queued job."""
-        job = self.jobs.get(job_id)
-        if not job or job.status != JobStatus.QUEUED:
-            return
-
-        if not job.vm_id or job.vm_id not in self.connections:
-            logger.warning(f"VM {job.vm_id} not available for job {job_id}")
+    def _start_job(self, job: Job) -> None:
+        """Start a queued job on its VM."""
+        connection = self.connections.get(job.vm_id)
+        if connection is None:
+            logger.warning(f"VM {job.vm_id} not available for job {job.id}")
             return
 
-        connection = self.connections[job.vm_id]
-
         # Mark as running
         job.status = JobStatus.RUNNING
         job.started_at = datetime.utcnow()
-        self.instance_tasks[job.vm_id] = job_id
-        connection.current_task_id = job_id
+        self.instance_tasks[job.vm_id] = job.id
+        connection.current_task_id = job.id
         connection.status = "busy"
 
         # Send task to VM
-        await connection.send(
-            {
-                "type": "task_start",
-                "task": {
-                    "id": job.id,
-                    "prompt": job.task_prompt,
-                    "policy": job.policy_profile,
-                    "max_runtime": job.max_runtime_minutes,
-                    "steps": [step.dict() for step in job.steps] if job.steps else [],
-                },
-            }
-        )
+        connection.send(job.task_start_frame())
 
         # Notify subscribers
-        await self._broadcast_event(
-            job_id,
-            create_event(
-                EventType.JOB_STARTED,
-                job_id,
-                type(
-                    "Payload",
-                    (),
-                    {
-                        "dict": lambda self: {
-                            "vm_id": job.vm_id,
-                            "started_at": job.started_at.isoformat(),
-                            "estimated_duration_minutes": job.max_runtime_minutes,
-                        }
-                    },
-                )(),
-            ),
+        self._maybe_broadcast(
+            job.id,
+            EventType.JOB_STARTED,
+            lambda: {
+                "vm_id": job.vm_id,
+                "started_at": job.started_at.isoformat(),
+                "estimated_duration_minutes": job.max_runtime_minutes,
+            },
         )
 
-        logger.info(f"Job {job_id} started on VM {job.vm_id}")
+        logger.info(f"Job {job.id} started on VM {job.vm_id}")
 
-    async def cancel_job(self, job_id: str, reason: str = "User cancelled"):
-        """Cancel a running job."""
+    def _cancel_job(self, job_id: str, reason: str) -> bool:
         job = self.jobs.get(job_id)
         if not job or not job.is_active:
             return False
 
         # Send cancel to VM
-        if job.vm_id and job.vm_id in self.connections:
-            connection = self.connections[job.vm_id]
-            await connection.send(
+        connection = self.connections.get(job.vm_id) if job.vm_id else None
+        if connection is not None:
+            connection.send(
                 {"type": "task_cancel", "task_id": job_id, "reason": reason}
             )
 
         job.status = JobStatus.CANCELLED
         job.completed_at = datetime.utcnow()
+        self.jobs.settle(job_id)
 
         # Release instance
-        if job.vm_id and job.vm_id in self.instance_tasks:
-            del self.instance_tasks[job.vm_id]
-            if job.vm_id in self.connections:
-                self.connections[job.vm_id].status = "online"
-                self.connections[job.vm_id].current_task_id = None
+        if self.instance_tasks.pop(job.vm_id, None) is not None and connection:
+            connection.status = "online"
+            connection.current_task_id = None
 
         # Notify subscribers
-        await self._broadcast_event(
+        self._maybe_broadcast(
             job_id,
-            create_event(
-                EventType.JOB_CANCELLED,
-                job_id,
-                type(
-                    "Payload",
-                    (),
-                    {
-                        "dict": lambda self: {
-                            "cancelled_by": "user",
-                            "reason": reason,
-                            "duration_seconds": job.duration_seconds,
-                        }
-                    },
-                )(),
-            ),
+            EventType.JOB_CANCELLED,
+            lambda: {
+                "cancelled_by": "user",
+                "reason": reason,
+                "duration_seconds": job.duration_seconds,
+            },
         )
 
         logger.info(f"Job {job_id} cancelled")
         return True
 
-    async def _handle_task_complete(
-        self, connection: VMConnection, task_id: str, result: dict
-    ):
-        """Handle task completion from VM."""
-        if task_id not in self.jobs:
-            logger.warning(f"Unknown task completed: {task_id}")
+    def _add_artifacts(self, transition: AddArtifacts) -> None:
+        """Append artifacts reported with a completed step to a running job."""
+        job = self.jobs.get(transition.job_id)
+        if job is None or not job.is_active:
+            return
+        for artifact in transition.artifacts:
+            job.add_artifact(artifact)
+
+    def _finish_job(self, transition: FinishJob) -> None:
+        """Handle task completion or failure reported by a VM."""
+        task_id = transition.task_id
+        job = self.jobs.get(task_id)
+        if job is None:
+            logger.warning(f"Unknown task finished: {task_id}")
             return
 
-        job = self.jobs[task_id]
-        job.status = JobStatus.COMPLETED
+        # Validate everything before the first mutation: only the VM running
+        # the task may finish it, and a cancelled or already finished job
+        # keeps its outcome (the VM's report may cross a user cancel)
+        if self.instance_tasks.get(transition.instance_id) != task_id:
+            logger.warning(
+                f"VM {transition.instance_id} reported finishing task {task_id} it does not own"
+            )
+            return
+        if not job.is_active:
+            logger.debug(f"Ignoring finish for {job.status.value} task {task_id}")
+            return
+        details = transition.details
+        if not isinstance(details, dict):
+            details = {"message": str(details)} if details else {}
+
+        job.status = transition.status
         job.completed_at = datetime.utcnow()
-        job.result = result.get("result")
-        job.artifacts = result.get("artifacts", [])
+        self.jobs.settle(task_id)
+        if transition.status == JobStatus.COMPLETED:
+            job.result = details.get("result")
+            # A final list replaces the artifacts collected step by step
+            artifacts = details.get("artifacts")
+            if artifacts:
+                job.artifacts = artifacts
+            event_type = EventType.JOB_COMPLETED
+            make_payload = lambda: {
+                "result": job.result,
+                "artifacts": job.artifacts,
+                "duration_seconds": job.duration_seconds,
+                "steps_completed": job.current_step,
+                "total_steps": len(job.steps),
+            }
+        else:
+            job.error_message = details.get("message")
+            job.error_code = details.get("code")
+            event_type = EventType.JOB_FAILED
+            make_payload = lambda: {
+                "error_message": job.error_message,
+                "error_code": job.error_code,
+                "duration_seconds": job.duration_seconds,
+            }
 
         # Release instance
-        if connection.instance_id in self.instance_tasks:
-            del self.instance_tasks[connection.instance_id]
-        connection.status = "online"
-        connection.current_task_id = None
+        self.instance_tasks.pop(transition.instance_id, None)
+        connection = self.connections.get(transition.instance_id)
+        if connection is not None:
+            connection.status = "online"
+            connection.current_task_id = None
 
         # Notify subscribers
-        await self._broadcast_event(
-            task_id,
-            create_event(
-                EventType.JOB_COMPLETED,
-                task_id,
-                type(
-                    "Payload",
-                    (),
-                    {
-                        "dict": lambda self: {
-                            "result": job.result,
-                            "artifacts": job.artifacts,
-                            "duration_seconds": job.duration_seconds,
-                            "steps_completed": job.current_step,
-                            "total_steps": len(job.steps),
-                        }
-                    },
-                )(),
-            ),
-        )
+        self._maybe_broadcast(task_id, event_type, make_payload)
 
-        logger.info(f"Job {task_id} completed")
+        if job.status == JobStatus.COMPLETED:
+            logger.info(f"Job {task_id} completed")
+        else:
+            logger.info(f"Job {task_id} failed: {job.error_message}")
 
-    async def _handle_task_failed(
-        self, connection: VMConnection, task_id: str, error: dict
-    ):
-        """Handle task failure from VM."""
-        if task_id not in self.jobs:
-            logger.warning(f"Unknown task failed: {task_id}")
+    def _release_vm(self, instance_id: str) -> None:
+        """Fail the task of a VM that went away."""
+        task_id = self.instance_tasks.pop(instance_id, None)
+        job = self.jobs.get(task_id) if task_id else None
+        if job is None or not job.is_active:
             return
 
-        job = self.jobs[task_id]
         job.status = JobStatus.FAILED
+        job.error_message = "VM disconnected unexpectedly"
         job.completed_at = datetime.utcnow()
-        job.error_message = error.get("message")
-        job.error_code = error.get("code")
-
-        # Release instance
-        if connection.instance_id in self.instance_tasks:
-            del self.instance_tasks[connection.instance_id]
-        connection.status = "online"
-        connection.current_task_id = None
-
-        # Notify subscribers
-        await self._broadcast_event(
+        self.jobs.settle(task_id)
+        self._maybe_broadcast(
             task_id,
-            create_event(
-                EventType.JOB_FAILED,
-                task_id,
-                type(
-                    "Payload",
-                    (),
-                    {
-                        "dict": lambda self: {
-                            "error_message": job.error_message,
-                            "error_code": job.error_code,
-                            "duration_seconds": job.duration_seconds,
-                        }
-                    },
-                )(),
-            ),
+            EventType.JOB_FAILED,
+            lambda: {
+                "error_message": "VM disconnected unexpectedly",
+                "duration_seconds": job.duration_seconds,
+            },
         )
 
-        logger.info(f"Job {task_id} failed: {job.error_message}")
-
     # ==========================================================================
     # Event Subscriptions
     # ==========================================================================
 
-    async def subscribe_to_job(self, job_id: str, websocket: WebSocket):
+    async def subscribe_to_job(self, job_id: str, websocket: WebSocket) -> None:
         """Subscribe a WebSocket to receive events for a job."""
-        if job_id not in self.event_subscribers:
-            self.event_subscribers[job_id] = set()
-        self.event_subscribers[job_id].add(websocket)
+        self._subscribe(job_id, websocket)
+
+    async def subscribe_and_snapshot(
+        self, job_id: str, websocket: WebSocket
+    ) -> Optional[Job]:
+        """
+        Subscribe a WebSocket to a job and queue the job's initial_state frame
+        ahead of any event, all without yielding. Returns the job, if known.
+        """
+        subscriber = self._subscribe(job_id, websocket)
+        job = self.jobs.get(job_id)
+        if job is not None:
+            subscriber.put(job.initial_state_frame())
+        return job
+
+    def _subscribe(self, job_id: str, websocket: WebSocket) -> OutboundQueue:
+        jobs = self._ws_to_jobs.get(websocket)
+        if jobs is None:
+            subscriber = OutboundQueue(
+                websocket,
+                "event subscriber",
+                maxsize=SUBSCRIBER_QUEUE_SIZE,
+                batch_size=EVENT_BATCH_SIZE,
+            )
+            subscriber.start()
+            self._subscriber_queues[websocket] = subscriber
+            jobs = self._ws_to_jobs[websocket] = set()
+        else:
+            subscriber = self._subscriber_queues[websocket]
+        if job_id not in jobs:
+            jobs.add(job_id)
+            self.event_subscribers.setdefault(job_id, []).append(subscriber)
         logger.debug(f"WebSocket subscribed to job {job_id}")
+        return subscriber
 
-    async def unsubscribe_from_job(self, job_id: str, websocket: WebSocket):
+    async def unsubscribe_from_job(
+        self, job_id: str, websocket: WebSocket
+    ) -> None:
         """Unsubscribe a WebSocket from a job."""
-        if job_id in self.event_subscribers:
-            self.event_subscribers[job_id].discard(websocket)
-            if not self.event_subscribers[job_id]:
-                del self.event_subscribers[job_id]
+        jobs = self._ws_to_jobs.get(websocket)
+        if not jobs or job_id not in jobs:
+            return
+        if len(jobs) == 1:
+            self.unsubscribe_all(websocket)
+        else:
+            jobs.discard(job_id)
+            self._detach_subscriber(job_id, self._subscriber_queues[websocket])
         logger.debug(f"WebSocket unsubscribed from job {job_id}")
 
-    async def _broadcast_event(self, job_id: str, event: Event):
-        """Broadcast an event to all subscribers."""
-        if job_id not in self.event_subscribers:
+    def unsubscribe_all(self, websocket: WebSocket) -> None:
+        """Drop every subscription of a WebSocket (on disconnect) and stop its queue."""
+        subscriber = self._subscriber_queues.pop(websocket, None)
+        if subscriber is None:
+            return
+        for job_id in self._ws_to_jobs.pop(websocket, ()):
+            self._detach_subscriber(job_id, subscriber)
+        subscriber.stop()
+
+    def send_to_subscriber(self, websocket: WebSocket, message: OutboundMessage) -> bool:
+        """Queue a reply on a subscribed WebSocket's send queue, behind its events."""
+        subscriber = self._subscriber_queues.get(websocket)
+        return subscriber is not None and subscriber.put(message)
+
+    def _detach_subscriber(self, job_id: str, subscriber: OutboundQueue) -> None:
+        subscribers = self.event_subscribers.get(job_id)
+        if subscribers is None:
+            return
+        try:
+            subscribers.remove(subscriber)
+        except ValueError:
+            pass
+        if not subscribers:
+            del self.event_subscribers[job_id]
+
+    def _maybe_broadcast(
+        self,
+        job_id: str,
+        event_type: EventType,
+        make_payload: Callable[[], Dict[str, Any]],
+    ) -> None:
+        """Build and publish an event only if someone (here or on another worker) may be subscribed."""
+        if job_id not in self.event_subscribers and self._relay_task is None:
+            return
+        self._publish_event(job_id, create_event(event_type, job_id, make_payload()))
+
+    def _publish_event(self, job_id: str, event: Event) -> None:
+        """Broadcast an event to local subscribers and relay it to the other workers."""
+        self._broadcast_event(job_id, event)
+        if self._relay_task is not None:
+            self._relay_queue.put_nowait(event)
+
+    def _broadcast_event(self, job_id: str, event: Event) -> None:
+        """Queue an event for every subscriber of a job (never blocks)."""
+        subscribers = self.event_subscribers.get(job_id)
+        if not subscribers:
             return
 
-        dead_subscribers = []
-        message = {"type": "event", "event": event.dict()}
-
-        for websocket in self.event_subscribers[job_id]:
-            try:
-                await websocket.send_json(message)
-            except Exception:
-                dead_subscribers.append(websocket)
+        # Serialized once here, not per subscriber
+        message = EncodedEvent(event)
+        dead = False
+        for subscriber in subscribers:
+            if not subscriber.put(message):
+                dead = True
 
-        # Clean up dead subscribers
-        for ws in dead_subscribers:
-            self.event_subscribers[job_id].discard(ws)
+        # Clean up dead subscribers (rare: their writer hit a send error)
+        if dead:
+            for subscriber in [s for s in subscribers if s.closed]:
+                self.unsubscribe_all(subscriber.websocket)
 
     # ==========================================================================
     # Approval Gates
     # ==========================================================================
 
-    async def _handle_approval_request(self, connection: VMConnection, message: dict):
+    def _track_request(
+        self, request_id: Optional[str], job_id: Optional[str]
+    ) -> None:
+        """Remember which job a VM request belongs to until it is answered."""
+        if request_id and job_id:
+            self._pending_requests[request_id] = (
+                job_id,
+                time.monotonic_ns() + PENDING_REQUEST_TTL_NS,
+            )
+
+    def _resolve_request(
+        self, request_id: str
+    ) -> Tuple[Optional[str], Optional[VMConnection]]:
+        """Pop a pending request and return its job ID and the VM running it."""
+        job_id, _ = self._pending_requests.pop(request_id, (None, 0))
+        job = self.jobs.get(job_id) if job_id else None
+        if not job or not job.vm_id:
+            return job_id, None
+        return job_id, self.connections.get(job.vm_id)
+
+    async def _handle_approval_request(
+        self, connection: VMConnection, message: Dict[str, Any]
+    ) -> None:
         """Handle an approval request from a VM."""
         request_id = message.get("request_id")
         job_id = message.get("job_id")
+        self._track_request(request_id, job_id)
 
         # Broadcast to UI subscribers
-        await self._broadcast_event(
+        self._maybe_broadcast(
             job_id,
-            create_event(
-                EventType.NEEDS_APPROVAL,
-                job_id,
-                type(
-                    "Payload", (), {"dict": lambda self: message.get("payload", {})}
-                )(),
-            ),
+            EventType.NEEDS_APPROVAL,
+            lambda: message.get("payload", {}),
         )
 
         # Trigger approval callbacks
-        for callback in self._approval_callbacks:
-            try:
-                await callback(message)
-            except Exception as e:
-                logger.error(f"Approval callback error: {e}")
+        if self._approval_callbacks:
+            await self._run_callbacks(self._approval_callbacks, message, "Approval")
 
     async def submit_approval_response(
         self, request_id: str, approved: bool, reason: Optional[str] = None
-    ):
+    ) -> bool:
         """Submit an approval response from the user."""
-        # Find which job/VM this request belongs to
-        for job_id, job in self.jobs.items():
-            if job.vm_id and job.vm_id in self.connections:
-                connection = self.connections[job.vm_id]
-                await connection.send(
-                    {
-                        "type": "approval_response",
-                        "request_id": request_id,
-                        "approved": approved,
-                        "reason": reason,
-                    }
-                )
+        job_id, connection = self._resolve_request(request_id)
+        if connection is None:
+            return False
 
-                await self._broadcast_event(
-                    job_id,
-                    create_event(
-                        EventType.APPROVAL_GRANTED
-                        if approved
-                        else EventType.APPROVAL_DENIED,
-                        job_id,
-                        type(
-                            "Payload",
-                            (),
-                            {
-                                "dict": lambda self: {
-                                    "request_id": request_id,
-                                    "approved": approved,
-                                    "reason": reason,
-                                }
-                            },
-                        )(),
-                    ),
-                )
-                return True
+        connection.send(
+            {
+                "type": "approval_response",
+                "request_id": request_id,
+                "approved": approved,
+                "reason": reason,
+            }
+        )
 
-        return False
+        self._maybe_broadcast(
+            job_id,
+            EventType.APPROVAL_GRANTED if approved else EventType.APPROVAL_DENIED,
+            lambda: {
+                "request_id": request_id,
+                "approved": approved,
+                "reason": reason,
+            },
+        )
+        return True
 
     # ==========================================================================
     # Context Requests
     # ==========================================================================
 
-    async def _handle_context_request(self, connection: VMConnection, message: dict):
+    async def _handle_context_request(
+        self, connection: VMConnection, message: Dict[str, Any]
+    ) -> None:
         """Handle a context request from a VM."""
         job_id = message.get("job_id")
+        self._track_request(message.get("request_id"), job_id)
 
         # Broadcast to UI subscribers
-        await self._broadcast_event(
+        self._maybe_broadcast(
             job_id,
-            create_event(
-                EventType.NEEDS_CONTEXT,
-                job_id,
-                type(
-                    "Payload", (), {"dict": lambda self: message.get("payload", {})}
-                )(),
-            ),
+            EventType.NEEDS_CONTEXT,
+            lambda: message.get("payload", {}),
         )
 
         # Trigger context callbacks
-        for callback in self._context_callbacks:
-            try:
-                await callback(message)
-            except Exception as e:
-                logger.error(f"Context callback error: {e}")
+        if self._context_callbacks:
+            await self._run_callbacks(self._context_callbacks, message, "Context")
 
     async def submit_context_response(
-        self, request_id: str, response: str, attachments: list = None
-    ):
+        self, request_id: str, response: str, attachments: Optional[list] = None
+    ) -> bool:
         """Submit a context response from the user."""
         attachments = attachments or []
 
-        # Find which job/VM this request belongs to
-        for job_id, job in self.jobs.items():
-            if job.vm_id and job.vm_id in self.connections:
-                connection = self.connections[job.vm_id]
-                await connection.send(
-                    {
-                        "type": "context_response",
-                        "request_id": request_id,
-                        "response": response,
-                        "attachments": attachments,
-                    }
-                )
+        job_id, connection = self._resolve_request(request_id)
+        if connection is None:
+            return False
 
-                await self._broadcast_event(
-                    job_id,
-                    create_event(
-                        EventType.CONTEXT_PROVIDED,
-                        job_id,
-                        type(
-                            "Payload",
-                            (),
-                            {
-                                "dict": lambda self: {
-                                    "request_id": request_id,
-                                    "response": response,
-                                    "attachments": attachments,
-                                }
-                            },
-                        )(),
-                    ),
-                )
-                return True
+        connection.send(
+            {
+                "type": "context_response",
+                "request_id": request_id,
+                "response": response,
+                "attachments": attachments,
+            }
+        )
 
-        return False
+        self._maybe_broadcast(
+            job_id,
+            EventType.CONTEXT_PROVIDED,
+            lambda: {
+                "request_id": request_id,
+                "response": response,
+                "attachments": attachments,
+            },
+        )
+        return True
 
     # ==========================================================================
     # Callback Registration
     # ==========================================================================
 
-    def on_event(self, event_type: EventType, callback: Callable):
+    async def _run_callbacks(self, callbacks: list, arg: Any, kind: str) -> None:
+        """Await callbacks concurrently so one slow callback does not delay the rest."""
+        try:
+            results = await asyncio.gather(
+                *(callback(arg) for callback in callbacks), return_exceptions=True
+            )
+        except Exception as e:  # A callback that is not a coroutine function
+            logger.error(f"{kind} callback error: {e}")
+            return
+        for result in results:
+            if isinstance(result, Exception):
+                logger.error(f"{kind} callback error: {result}")
+
+    def on_event(self, event_type: EventType, callback: Callable) -> None:
         """Register a callback for a specific event type."""
         if event_type not in self._event_callbacks:
             self._event_callbacks[event_type] = []
         self._event_callbacks[event_type].append(callback)
 
-    def on_approval(self, callback: Callable):
+    def on_approval(self, callback: Callable) -> None:
         """Register a callback for approval requests."""
         self._approval_callbacks.append(callback)
 
-    def on_context(self, callback: Callable):
+    def on_context(self, callback: Callable) -> None:
         """Register a callback for context requests."""
         self._context_callbacks.append(callback)
 
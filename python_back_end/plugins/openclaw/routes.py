@@ -4,10 +4,14 @@ OpenClaw API Routes
 FastAPI routes for OpenClaw integration.
 """
 
-from typing import List, Optional
-from datetime import datetime, timedelta
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional
+import asyncio
+import logging
+import os
 import uuid
 
+import orjson
 from fastapi import (
     APIRouter,
     WebSocket,
@@ -15,23 +19,64 @@ from fastapi import (
     Depends,
     HTTPException,
     BackgroundTasks,
+    Request,
 )
-from fastapi.responses import JSONResponse
+from fastapi.responses import FileResponse, JSONResponse, Response
 
-from ..core.events import EventType
+from ..core.events import EventType, json_dumps
 from ..core.job_schema import (
     Job,
+    BatchGetRequest,
     CreateJobRequest,
     JobResponse,
     JobListResponse,
     JobStatus,
 )
+from ..core.migration import BATCH_GET_INSTANCES_SQL, GET_SCREENSHOT_PATH_SQL
 from ..core.models import OpenClawInstance, OpenClawTask, OpenClawEvent
-from .bridge import bridge
+from .bridge import (
+    VM_AUTH_TIMEOUT,
+    VM_MAX_MISSED_PINGS,
+    VM_PING_INTERVAL,
+    VMConnection,
+    bridge,
+    receive_message,
+    utc_now_iso,
+)
+
+logger = logging.getLogger(__name__)
 
 # Create router
 router = APIRouter(prefix="/api/openclaw", tags=["openclaw"])
 
+# Several uvicorn workers each run a bridge; events are relayed between them
+_RELAY_EVENTS = int(os.getenv("UVICORN_WORKERS", "1")) > 1
+
+
+@asynccontextmanager
+async def bridge_lifespan(db_pool: Optional[Any] = None) -> AsyncIterator[None]:
+    """
+    Run the OpenClaw bridge for the app's lifetime; nest this in the app
+    lifespan, inside the one owning db_pool (the bridge stops first).
+    """
+    await bridge.start(db_pool=db_pool, relay_events=_RELAY_EVENTS and db_pool is not None)
+    try:
+        yield
+    finally:
+        await bridge.stop()
+
+
+# Public websocket base URL handed to clients, e.g. wss://harvis.example.com
+WS_BASE_URL = os.getenv("WS_BASE_URL", "ws://localhost:8000").rstrip("/")
+_WS_URL_PREFIX = WS_BASE_URL + "/ws/openclaw/tasks/"
+_VM_WS_URL_PREFIX = WS_BASE_URL + "/ws/openclaw/vm/"
+_TASK_QUEUED_MESSAGE = "Task queued for execution"
+
+# Browser task sockets read text frames (JSON.parse(event.data)), so their
+# orjson output is sent as text; VM sockets get binary frames.
+_PONG_FRAME = json_dumps({"type": "pong"})
+_AUTH_ERROR_FRAME = json_dumps({"type": "error", "message": "Expected auth message"})
+
 
 # =============================================================================
 # Instance Management
@@ -83,6 +128,41 @@ async def list_instances(user_id: int = 1):
     return []
 
 
+@router.post("/instances:batchGet", response_model=dict)
+async def batch_get_instances(
+    body: BatchGetRequest, request: Request, user_id: int = 1
+):
+    """
+    Get several instances in one call: {instance_id: instance}.
+
+    Dashboards should use this instead of one GET per instance; it is a single
+    query. Unknown IDs and instances of other users are left out.
+    """
+    pool = getattr(request.app.state, "pg_pool", None)
+    if pool is None:
+        return {}
+
+    ids = []
+    for instance_id in body.ids:
+        try:
+            ids.append(uuid.UUID(instance_id))
+        except ValueError:
+            continue
+    if not ids:
+        return {}
+
+    async with pool.acquire() as conn:
+        rows = await conn.fetch(BATCH_GET_INSTANCES_SQL, ids, user_id)
+
+    instances = {}
+    for row in rows:
+        data = dict(row)
+        if isinstance(data["vm_config"], str):
+            data["vm_config"] = orjson.loads(data["vm_config"])
+        instances[data["id"]] = OpenClawInstance(**data).dict()
+    return instances
+
+
 @router.get("/instances/{instance_id}", response_model=dict)
 async def get_instance(instance_id: str, user_id: int = 1):
     """Get details of a specific instance."""
@@ -96,7 +176,7 @@ async def get_bridge_config(instance_id: str, user_id: int = 1):
     # TODO: Query from database and verify ownership
 
     # Generate bridge URL
-    bridge_url = f"ws://localhost:8000/ws/openclaw/vm/{instance_id}"
+    bridge_url = _VM_WS_URL_PREFIX + instance_id
 
     return {
         "instance_id": instance_id,
@@ -124,7 +204,7 @@ async def create_task(
 
     This creates a job and queues it for execution on an available VM.
     """
-    job_id = str(uuid.uuid4())
+    job_id = uuid.uuid4().hex  # Still a valid UUID for the uuid DB columns
 
     # Create job
     job = Job(
@@ -144,15 +224,18 @@ async def create_task(
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to submit job: {str(e)}")
 
-    # Build websocket URL for real-time updates
-    websocket_url = f"ws://localhost:8000/ws/openclaw/tasks/{job_id}"
-
-    return {
-        "job": job.dict(),
-        "websocket_url": websocket_url,
-        "status": job.status,
-        "message": "Task queued for execution",
-    }
+    # Encoded directly: skips jsonable_encoder's walk over the job dict
+    return Response(
+        content=json_dumps(
+            {
+                "job": job.cached_dict(),
+                "websocket_url": _WS_URL_PREFIX + job_id,  # For real-time updates
+                "status": job.status,
+                "message": _TASK_QUEUED_MESSAGE,
+            }
+        ),
+        media_type="application/json",
+    )
 
 
 @router.get("/tasks", response_model=List[dict])
@@ -162,34 +245,54 @@ async def list_tasks(status: Optional[str] = None, limit: int = 50, user_id: int
     return []
 
 
-@router.get("/tasks/{task_id}", response_model=dict)
-async def get_task(task_id: str, user_id: int = 1):
-    """Get details of a specific task."""
-    if task_id not in bridge.jobs:
+async def get_job_or_404(task_id: str) -> Job:
+    """Dependency: the job for the task_id path parameter, or a 404."""
+    job = bridge.jobs.get(task_id)
+    if job is None:
         raise HTTPException(status_code=404, detail="Task not found")
-
-    job = bridge.jobs[task_id]
-
     # TODO: Verify user owns this job
+    return job
+
 
+def _task_details(job: Job) -> dict:
     return {
-        "job": job.dict(),
+        "job": job.cached_dict(),
         "duration_seconds": job.duration_seconds,
         "progress_percentage": job.progress_percentage,
         "is_active": job.is_active,
     }
 
 
-@router.post("/tasks/{task_id}/cancel", response_model=dict)
-async def cancel_task(task_id: str, reason: str = "User cancelled", user_id: int = 1):
-    """Cancel a running task."""
-    if task_id not in bridge.jobs:
-        raise HTTPException(status_code=404, detail="Task not found")
+@router.post("/tasks:batchGet", response_model=dict)
+async def batch_get_tasks(body: BatchGetRequest, user_id: int = 1):
+    """
+    Get several tasks in one call: {task_id: task details}.
 
-    job = bridge.jobs[task_id]
+    Same shape per task as GET /tasks/{task_id}; unknown IDs are left out.
+    """
+    # TODO: Verify user owns these jobs
+    tasks = {}
+    for task_id in body.ids:
+        job = bridge.jobs.get(task_id)
+        if job is not None:
+            tasks[task_id] = _task_details(job)
+    return tasks
 
-    # TODO: Verify user owns this job
 
+@router.get("/tasks/{task_id}", response_model=dict)
+async def get_task(job: Job = Depends(get_job_or_404), user_id: int = 1):
+    """Get details of a specific task."""
+    return _task_details(job)
+
+
+@router.post("/tasks/{task_id}/cancel", response_model=dict)
+async def cancel_task(
+    task_id: str,
+    reason: str = "User cancelled",
+    job: Job = Depends(get_job_or_404),
+    user_id: int = 1,
+):
+    """Cancel a running task."""
     if not job.is_active:
         raise HTTPException(status_code=400, detail="Task is not active")
 
@@ -208,18 +311,13 @@ async def cancel_task(task_id: str, reason: str = "User cancelled", user_id: int
 
 @router.post("/tasks/{task_id}/approve", response_model=dict)
 async def approve_action(
-    task_id: str,
     request_id: str,
     approved: bool,
     reason: Optional[str] = None,
+    job: Job = Depends(get_job_or_404),
     user_id: int = 1,
 ):
     """Approve or deny an action requiring approval."""
-    if task_id not in bridge.jobs:
-        raise HTTPException(status_code=404, detail="Task not found")
-
-    # TODO: Verify user owns this job
-
     success = await bridge.submit_approval_response(request_id, approved, reason)
 
     if not success:
@@ -237,18 +335,13 @@ async def approve_action(
 
 @router.post("/tasks/{task_id}/context", response_model=dict)
 async def provide_context(
-    task_id: str,
     request_id: str,
     response: str,
     attachments: Optional[List[dict]] = None,
+    job: Job = Depends(get_job_or_404),
     user_id: int = 1,
 ):
     """Provide context/clarification for a task."""
-    if task_id not in bridge.jobs:
-        raise HTTPException(status_code=404, detail="Task not found")
-
-    # TODO: Verify user owns this job
-
     success = await bridge.submit_context_response(
         request_id, response, attachments or []
     )
@@ -259,7 +352,7 @@ async def provide_context(
     return {
         "success": True,
         "request_id": request_id,
-        "provided_at": datetime.utcnow().isoformat(),
+        "provided_at": utc_now_iso(),
     }
 
 
@@ -268,6 +361,25 @@ async def provide_context(
 # =============================================================================
 
 
+async def _on_vm_pong(message: dict, connection: VMConnection) -> None:
+    pass  # The receive loop already recorded the activity
+
+
+async def _on_task_ping(message: dict, websocket: WebSocket) -> None:
+    # Through the subscriber queue: its writer is the socket's only sender
+    bridge.send_to_subscriber(websocket, _PONG_FRAME)
+
+
+# Message type -> handler. VM messages without an entry go to the bridge;
+# task socket messages without one are ignored.
+_VM_HANDLERS: Dict[str, Callable[[dict, VMConnection], Awaitable[None]]] = {
+    "pong": _on_vm_pong,
+}
+_TASK_HANDLERS: Dict[str, Callable[[dict, WebSocket], Awaitable[None]]] = {
+    "ping": _on_task_ping,
+}
+
+
 @router.websocket("/ws/openclaw/vm/{instance_id}")
 async def vm_websocket(websocket: WebSocket, instance_id: str):
     """
@@ -279,11 +391,16 @@ async def vm_websocket(websocket: WebSocket, instance_id: str):
 
     # Authenticate connection
     try:
-        auth_msg = await websocket.receive_json()
-        if auth_msg.get("type") != "auth":
-            await websocket.send_json(
-                {"type": "error", "message": "Expected auth message"}
+        try:
+            auth_msg = await asyncio.wait_for(
+                receive_message(websocket), VM_AUTH_TIMEOUT
             )
+        except asyncio.TimeoutError:
+            logger.info(f"VM {instance_id} did not authenticate in time")
+            await websocket.close(code=1008)
+            return
+        if auth_msg.get("type") != "auth":
+            await websocket.send_bytes(_AUTH_ERROR_FRAME)
             await websocket.close()
             return
 
@@ -298,25 +415,36 @@ async def vm_websocket(websocket: WebSocket, instance_id: str):
             user_id=user_id,
         )
 
-        # Keep connection alive
+        # Only reader of the socket; an idle VM is pinged, and dropped once
+        # VM_MAX_MISSED_PINGS pings in a row go unanswered
+        missed_pings = 0
         while True:
             try:
-                message = await websocket.receive_json()
-
-                if message.get("type") == "pong":
-                    connection.last_ping = datetime.utcnow()
-                else:
-                    # Process other messages
-                    pass
-
-            except WebSocketDisconnect:
-                break
-            except Exception as e:
-                print(f"VM WebSocket error: {e}")
-                break
-
-    except Exception as e:
-        print(f"VM connection error: {e}")
+                message = await asyncio.wait_for(
+                    receive_message(websocket), VM_PING_INTERVAL
+                )
+            except asyncio.TimeoutError:
+                if missed_pings == VM_MAX_MISSED_PINGS:
+                    logger.info(f"VM {instance_id} stopped responding")
+                    break
+                missed_pings += 1
+                connection.ping()
+                continue
+            missed_pings = 0
+            bridge.record_activity(connection)
+
+            handler = _VM_HANDLERS.get(message.get("type"))
+            if handler is not None:
+                await handler(message, connection)
+            else:
+                await bridge.handle_vm_message(connection, message)
+
+    except WebSocketDisconnect:
+        pass
+    except (ValueError, AttributeError) as e:
+        # Undecodable frame or non-object JSON: drop the VM
+        logger.warning(f"Malformed message from VM {instance_id}: {e}")
+        await websocket.close(code=1003)
     finally:
         await bridge.disconnect_vm(instance_id)
 
@@ -330,32 +458,25 @@ async def task_events_websocket(websocket: WebSocket, task_id: str):
     """
     await websocket.accept()
 
-    # Subscribe to job events
-    await bridge.subscribe_to_job(task_id, websocket)
+    # Subscribe to job events; the initial state (if the job exists) is the
+    # first frame on the subscriber's send queue
+    await bridge.subscribe_and_snapshot(task_id, websocket)
 
     try:
-        # Send initial state if job exists
-        if task_id in bridge.jobs:
-            job = bridge.jobs[task_id]
-            await websocket.send_json({"type": "initial_state", "job": job.dict()})
-
         # Keep connection alive and handle client messages
         while True:
-            try:
-                message = await websocket.receive_json()
-
-                # Handle client messages (e.g., ping, requests)
-                if message.get("type") == "ping":
-                    await websocket.send_json({"type": "pong"})
-
-            except WebSocketDisconnect:
-                break
-            except Exception as e:
-                print(f"Task WebSocket error: {e}")
-                break
-
+            message = await receive_message(websocket)
+            handler = _TASK_HANDLERS.get(message.get("type"))
+            if handler is not None:
+                await handler(message, websocket)
+
+    except WebSocketDisconnect:
+        pass
+    except (ValueError, AttributeError) as e:
+        logger.warning(f"Malformed message on task {task_id} socket: {e}")
+        await websocket.close(code=1003)
     finally:
-        await bridge.unsubscribe_from_job(task_id, websocket)
+        bridge.unsubscribe_all(websocket)
 
 
 # =============================================================================
@@ -371,17 +492,33 @@ async def list_screenshots(task_id: str, user_id: int = 1):
 
 
 @router.get("/tasks/{task_id}/screenshots/{screenshot_id}")
-async def get_screenshot(task_id: str, screenshot_id: str, user_id: int = 1):
-    """Get a specific screenshot."""
-    # TODO: Return screenshot file
-    raise HTTPException(status_code=404, detail="Screenshot not found")
+async def get_screenshot(
+    task_id: str, screenshot_id: str, request: Request, user_id: int = 1
+):
+    """
+    Get a specific screenshot.
+
+    Served with FileResponse, which streams the file from disk (sendfile where
+    the server supports it) instead of reading it into memory.
+    """
+    # TODO: Verify user owns this task
+    pool = getattr(request.app.state, "pg_pool", None)
+    if pool is None:
+        raise HTTPException(status_code=404, detail="Screenshot not found")
+    try:
+        ids = uuid.UUID(screenshot_id), uuid.UUID(task_id)
+    except ValueError:
+        raise HTTPException(status_code=404, detail="Screenshot not found")
+
+    async with pool.acquire() as conn:
+        path = await conn.fetchval(GET_SCREENSHOT_PATH_SQL, *ids)
+    if path is None or not os.path.isfile(path):
+        raise HTTPException(status_code=404, detail="Screenshot not found")
+    return FileResponse(path, media_type="image/png")
 
 
 @router.get("/tasks/{task_id}/artifacts", response_model=List[dict])
-async def list_artifacts(task_id: str, user_id: int = 1):
+async def list_artifacts(job: Job = Depends(get_job_or_404), user_id: int = 1):
     """List artifacts generated by a task."""
-    if task_id not in bridge.jobs:
-        raise HTTPException(status_code=404, detail="Task not found")
-
-    job = bridge.jobs[task_id]
-    return job.artifacts or []
+    # Pollers get the cached encoding until the job changes
+    return Response(content=job.artifacts_json(), media_type="application/json")
@@ -0,0 +1,90 @@
+"""
+Tests for the Job model's cached serializations
+"""
+
+import orjson
+
+from plugins.core.events import json_dumps
+from plugins.core.job_schema import Job, JobStatus
+
+
+def make_job(**fields):
+    return Job(id="job-1", user_id=1, task_prompt="Open the browser", **fields)
+
+
+class TestArtifactsJson:
+    """Job.artifacts_json() caching and invalidation"""
+
+    def test_empty(self):
+        assert make_job().artifacts_json() == b"[]"
+
+    def test_null_artifacts_encode_as_empty_list(self):
+        job = make_job()
+        job.artifacts = None
+        assert job.artifacts_json() == b"[]"
+
+    def test_cached_until_changed(self):
+        job = make_job(artifacts=[{"name": "report.pdf"}])
+        first = job.artifacts_json()
+        assert job.artifacts_json() is first
+
+        job.artifacts = [{"name": "report.pdf"}, {"name": "log.txt"}]
+        assert orjson.loads(job.artifacts_json()) == job.artifacts
+
+    def test_invalidated_by_any_field_assignment(self):
+        job = make_job()
+        first = job.artifacts_json()
+        job.status = JobStatus.RUNNING
+        assert job.artifacts_json() is not first
+
+
+class TestAddArtifact:
+    """Job.add_artifact() splices into the cached artifacts JSON"""
+
+    def test_spliced_json_matches_full_encoding(self):
+        job = make_job()
+        assert job.artifacts_json() == json_dumps(job.artifacts)
+
+        for i in range(5):
+            job.add_artifact({"name": f"shot-{i}.png", "size": i, "tags": ["a", "b"]})
+            assert job.artifacts_json() == json_dumps(job.artifacts)
+
+        assert len(job.artifacts) == 5
+
+    def test_append_without_cache(self):
+        job = make_job()
+        job.add_artifact({"name": "report.pdf"})
+        assert job.artifacts_json() == json_dumps([{"name": "report.pdf"}])
+
+    def test_invalidates_job_dict(self):
+        job = make_job()
+        job.cached_dict()
+        job.add_artifact({"name": "report.pdf"})
+        assert job.cached_dict()["artifacts"] == [{"name": "report.pdf"}]
+
+
+class TestCachedDict:
+    """Job.cached_dict() and the initial_state frame"""
+
+    def test_reflects_status_change(self):
+        job = make_job(status=JobStatus.QUEUED)
+        assert job.cached_dict()["status"] == JobStatus.QUEUED
+        frame = job.initial_state_frame()
+
+        job.status = JobStatus.RUNNING
+        assert job.cached_dict()["status"] == JobStatus.RUNNING
+        assert orjson.loads(job.initial_state_frame())["job"]["status"] == "running"
+        assert job.initial_state_frame() != frame
+
+    def test_mark_dirty_after_in_place_edit(self):
+        job = make_job()
+        job.cached_dict()
+        job.metadata["key"] = "value"
+        job.mark_dirty()
+        assert job.cached_dict()["metadata"] == {"key": "value"}
+
+    def test_task_start_frame_kept_across_status_changes(self):
+        job = make_job()
+        frame = job.task_start_frame()
+        job.status = JobStatus.RUNNING
+        assert job.task_start_frame() is frame
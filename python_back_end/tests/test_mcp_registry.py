@@ -0,0 +1,144 @@
+"""
+Tests for the MCP registry's index-addressed server and tool storage
+"""
+
+from plugins.core.models import MCPServer
+from plugins.mcp.registry import MCPRegistry
+
+
+def make_server(server_id="srv-1", user_id=1, **fields):
+    return MCPServer(id=server_id, user_id=user_id, name=server_id, host="localhost", **fields)
+
+
+def assert_indexes_consistent(registry):
+    """Every ID/name index points at a live slot that agrees with it."""
+    for server_id, idx in registry._server_id_to_idx.items():
+        assert registry._server_list[idx].id == server_id
+    for user_id, indices in registry._servers_by_user.items():
+        for idx in indices:
+            assert registry._server_list[idx].user_id == user_id
+    for tool_id, idx in registry._tool_id_to_idx.items():
+        tool = registry._tool_list[idx]
+        assert tool.id == tool_id
+        server_idx = registry._tool_server_idx[idx]
+        assert registry._server_list[server_idx].id == tool.server_id
+        assert idx in registry._server_tool_indices[server_idx]
+        assert registry._tool_by_server_name[(server_idx, tool.name)] == idx
+    assert len(registry._tool_by_server_name) == len(registry._tool_id_to_idx)
+
+
+class TestRegistration:
+    def test_register_and_unregister(self):
+        registry = MCPRegistry()
+        registry.register_server(make_server())
+        assert registry.get_server("srv-1").name == "srv-1"
+
+        assert registry.unregister_server("srv-1") is True
+        assert registry.get_server("srv-1") is None
+        assert registry.list_servers() == []
+        assert registry.list_servers(user_id=1) == []
+        assert registry.unregister_server("srv-1") is False
+        assert_indexes_consistent(registry)
+
+    def test_openclaw_tools_indexed(self):
+        registry = MCPRegistry()
+        server_id = registry.register_openclaw_server(user_id=1, instance_id="vm-1")
+
+        tools = registry.list_tools(server_id)
+        assert len(tools) == 5
+        assert registry.get_tool(f"{server_id}-click").name == "browser_click"
+        assert registry.get_tool_by_name(server_id, "browser_type").id == f"{server_id}-type"
+        assert registry.list_tools_for_user(1) == tools
+        assert_indexes_consistent(registry)
+
+    def test_unregister_drops_tools(self):
+        registry = MCPRegistry()
+        server_id = registry.register_openclaw_server(user_id=1, instance_id="vm-1")
+        registry.unregister_server(server_id)
+
+        assert registry.list_tools() == []
+        assert registry.list_tools_for_user(1) == []
+        assert registry.get_tool(f"{server_id}-click") is None
+        assert registry.get_tool_by_name(server_id, "browser_click") is None
+        assert_indexes_consistent(registry)
+
+    def test_reregister_replaces_server_and_tools(self):
+        registry = MCPRegistry()
+        registry.register_openclaw_server(user_id=1, instance_id="vm-1", name="First")
+        server_id = registry.register_openclaw_server(user_id=1, instance_id="vm-1", name="Second")
+
+        assert [s.name for s in registry.list_servers()] == ["Second"]
+        assert len(registry.list_tools()) == 5
+        assert len(registry.list_tools_for_user(1)) == 5
+        tool = registry.get_tool(f"{server_id}-navigate")
+        assert registry.execute_tool(tool.id, {"url": "https://example.com"})["tool"] == "browser_navigate"
+        assert_indexes_consistent(registry)
+
+    def test_reregister_under_new_owner(self):
+        registry = MCPRegistry()
+        registry.register_server(make_server(user_id=1))
+        registry.register_server(make_server(user_id=2))
+
+        assert registry.list_servers(user_id=1) == []
+        assert [s.user_id for s in registry.list_servers(user_id=2)] == [2]
+        assert_indexes_consistent(registry)
+
+    def test_update_owner_moves_user_index(self):
+        registry = MCPRegistry()
+        registry.register_openclaw_server(user_id=1, instance_id="vm-1")
+        registry.update_server("openclaw-vm-1", {"user_id": 2})
+
+        assert registry.list_tools_for_user(1) == []
+        assert len(registry.list_tools_for_user(2)) == 5
+        assert_indexes_consistent(registry)
+
+    def test_openclaw_schemas_are_per_tool_copies(self):
+        registry = MCPRegistry()
+        first = registry.register_openclaw_server(user_id=1, instance_id="vm-1")
+        second = registry.register_openclaw_server(user_id=1, instance_id="vm-2")
+
+        schema = registry.get_tool(f"{first}-type").parameters
+        assert schema["required"] == ["selector", "text"]
+        schema["properties"]["selector"]["description"] = "changed"
+        schema["required"].append("extra")
+
+        other = registry.get_tool(f"{second}-type").parameters
+        assert other["properties"]["selector"]["description"] == "CSS selector or XPath"
+        assert other["required"] == ["selector", "text"]
+        click = registry.get_tool(f"{first}-click").parameters
+        assert click["properties"]["selector"]["description"] == "CSS selector or XPath"
+
+    def test_disabled_server_hidden(self):
+        registry = MCPRegistry()
+        registry.register_openclaw_server(user_id=1, instance_id="vm-1")
+        registry.update_server("openclaw-vm-1", {"enabled": False})
+
+        assert registry.list_servers() == []
+        assert len(registry.list_servers(enabled_only=False)) == 1
+        assert registry.list_tools_for_user(1) == []
+
+
+class TestSlotReuse:
+    def test_freed_slots_refilled(self):
+        registry = MCPRegistry()
+        registry.register_openclaw_server(user_id=1, instance_id="keep")
+        for i in range(50):
+            server_id = registry.register_openclaw_server(user_id=2, instance_id=f"vm-{i}")
+            registry.unregister_server(server_id)
+
+        assert len(registry._server_list) == 2
+        assert len(registry._tool_list) == 10
+        assert_indexes_consistent(registry)
+
+    def test_reused_slots_serve_new_server(self):
+        registry = MCPRegistry()
+        first = registry.register_openclaw_server(user_id=1, instance_id="vm-1")
+        registry.register_openclaw_server(user_id=1, instance_id="vm-2")
+        registry.unregister_server(first)
+        server_id = registry.register_openclaw_server(user_id=3, instance_id="vm-3")
+
+        assert registry.get_server(server_id).user_id == 3
+        assert {t.server_id for t in registry.list_tools_for_user(3)} == {server_id}
+        assert len(registry.list_tools()) == 10
+        assert registry.get_tool(f"{first}-click") is None
+        assert_indexes_consistent(registry)
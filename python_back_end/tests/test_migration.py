@@ -0,0 +1,76 @@
+"""
+Tests for the MCP plugin migration runner
+"""
+
+import asyncio
+from contextlib import asynccontextmanager
+
+from plugins.core.migration import (
+    INVALID_INDEXES_SQL,
+    MIGRATION_DDL,
+    MIGRATION_INDEX_NAMES,
+    MIGRATION_INDEXES,
+    MIGRATION_SQL,
+    run_migration,
+)
+from plugins.core.models import SQL_SCHEMA
+
+
+class FakeConnection:
+    """Records statements in the order an asyncpg connection would run them."""
+
+    def __init__(self, invalid=()):
+        self.invalid = list(invalid)
+        self.statements = []
+
+    @asynccontextmanager
+    async def transaction(self):
+        self.statements.append("BEGIN")
+        yield
+        self.statements.append("COMMIT")
+
+    async def execute(self, statement, *args):
+        self.statements.append(statement)
+
+    async def fetch(self, query, *args):
+        assert query == INVALID_INDEXES_SQL
+        return [{"relname": name} for name in self.invalid if name in args[0]]
+
+
+class TestRunMigration:
+    def test_ddl_in_transaction_then_indexes(self):
+        conn = FakeConnection()
+        asyncio.run(run_migration(conn))
+
+        assert conn.statements == ["BEGIN", MIGRATION_DDL, "COMMIT", *MIGRATION_INDEXES]
+
+    def test_invalid_indexes_left_alone_by_default(self):
+        conn = FakeConnection(invalid=["idx_openclaw_events_task_created"])
+        asyncio.run(run_migration(conn))
+
+        assert not any(s.startswith("DROP INDEX CONCURRENTLY IF EXISTS \"") for s in conn.statements)
+
+    def test_invalid_index_dropped_before_rebuild(self):
+        conn = FakeConnection(invalid=["idx_openclaw_events_task_created"])
+        asyncio.run(run_migration(conn, rebuild_invalid_indexes=True))
+
+        drop = 'DROP INDEX CONCURRENTLY IF EXISTS "idx_openclaw_events_task_created"'
+        create = next(s for s in MIGRATION_INDEXES if "idx_openclaw_events_task_created" in s)
+        assert conn.statements.index("COMMIT") < conn.statements.index(drop)
+        assert conn.statements.index(drop) < conn.statements.index(create)
+
+    def test_index_names_cover_every_create(self):
+        creates = [s for s in MIGRATION_INDEXES if s.startswith("CREATE")]
+        assert len(MIGRATION_INDEX_NAMES) == len(creates)
+        assert "idx_approval_gates_pending" in MIGRATION_INDEX_NAMES
+
+
+class TestSchemaSource:
+    def test_models_schema_is_the_migration(self):
+        assert SQL_SCHEMA == MIGRATION_SQL
+
+    def test_schema_covers_enums_unlogged_and_chat_indexes(self):
+        assert "ALTER COLUMN status TYPE openclaw_task_status" in SQL_SCHEMA
+        assert "ALTER TABLE openclaw_events SET UNLOGGED" in SQL_SCHEMA
+        assert "idx_chat_messages_tool_calls" in SQL_SCHEMA
+        assert "idx_chat_messages_tool_results" in SQL_SCHEMA
@@ -0,0 +1,542 @@
+"""
+Tests for the OpenClaw bridge: VM liveness, job state, send queues and the job cache
+"""
+
+import asyncio
+import uuid
+from contextlib import asynccontextmanager
+from datetime import timezone
+
+import orjson
+import pytest
+
+import plugins.openclaw.bridge as bridge_module
+from plugins.core.events import Event, json_dumps
+from plugins.core.job_schema import Job, JobStatus
+from plugins.core.migration import (
+    EXPIRE_APPROVALS_SQL,
+    INSERT_EVENTS_SQL,
+    NOTIFY_EVENTS_SQL,
+)
+from plugins.openclaw.bridge import (
+    VM_LIVENESS_TIMEOUT_NS,
+    AddArtifacts,
+    EncodedEvent,
+    FinishJob,
+    JobCache,
+    OpenClawBridge,
+    OutboundQueue,
+    VMConnection,
+)
+
+
+class FakeWebSocket:
+    """Stands in for a Starlette WebSocket; the bridge only keeps a reference."""
+
+
+class FakeClock:
+    """Controllable replacement for time.monotonic_ns in the bridge module."""
+
+    def __init__(self):
+        self.now = 1_000_000_000_000
+
+    def __call__(self):
+        return self.now
+
+    def advance(self, seconds):
+        self.now += int(seconds * 1_000_000_000)
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(bridge_module.time, "monotonic_ns", fake)
+    return fake
+
+
+def connect(bridge, instance_id="vm-1"):
+    connection = VMConnection(instance_id, FakeWebSocket(), "token", 1)
+    bridge.connections[instance_id] = connection
+    bridge._schedule_expiry(connection)
+    return connection
+
+
+class TestVMLiveness:
+    """Deadline heap and activity tracking"""
+
+    def test_idle_vm_expires(self, clock):
+        bridge = OpenClawBridge()
+        connect(bridge)
+
+        clock.advance(30)
+        assert bridge._pop_expired_connections() == []
+
+        clock.advance(31)
+        assert bridge._pop_expired_connections() == ["vm-1"]
+
+    def test_busy_vm_streaming_messages_stays_alive(self, clock):
+        bridge = OpenClawBridge()
+        connection = connect(bridge)
+        connection.status = "busy"
+
+        # A message every 10 s for five minutes, never a pong
+        for _ in range(30):
+            clock.advance(10)
+            bridge.record_activity(connection)
+            assert bridge._pop_expired_connections() == []
+
+        # Goes quiet: dead one timeout after the last message
+        clock.advance(VM_LIVENESS_TIMEOUT_NS / 1_000_000_000 + 1)
+        assert bridge._pop_expired_connections() == ["vm-1"]
+
+    def test_activity_does_not_grow_the_heap(self, clock):
+        bridge = OpenClawBridge()
+        connection = connect(bridge)
+
+        for _ in range(1000):
+            bridge.record_activity(connection)
+
+        assert len(bridge._expiry_heap) == 1
+
+    def test_offline_vm_is_dead(self, clock):
+        bridge = OpenClawBridge()
+        connection = connect(bridge)
+        connection.status = "offline"
+
+        clock.advance(61)
+        assert bridge._pop_expired_connections() == ["vm-1"]
+
+    def test_reconnect_supersedes_old_deadline(self, clock):
+        bridge = OpenClawBridge()
+        connect(bridge)
+        clock.advance(50)
+        connect(bridge)  # Same instance reconnects
+
+        clock.advance(20)  # Past the first connection's deadline only
+        assert bridge._pop_expired_connections() == []
+
+
+def running_job(bridge, instance_id="vm-1"):
+    job = Job(
+        id="job-1", user_id=1, task_prompt="x", status=JobStatus.RUNNING, vm_id=instance_id
+    )
+    bridge.jobs[job.id] = job
+    bridge.instance_tasks[instance_id] = job.id
+    return job
+
+
+class TestSubmitJob:
+    """Jobs pinned to a specific VM"""
+
+    def test_disconnected_instance_rejected(self):
+        bridge = OpenClawBridge()
+        job = Job(id="job-1", user_id=1, task_prompt="x")
+
+        with pytest.raises(Exception, match="not connected"):
+            bridge._submit_job(job, "vm-1")
+
+        assert "job-1" not in bridge.jobs
+        assert len(bridge.jobs._active) == 0
+
+    def test_busy_instance_rejected(self):
+        bridge = OpenClawBridge()
+        connect(bridge)
+        running = running_job(bridge)
+
+        with pytest.raises(Exception, match="busy"):
+            bridge._submit_job(Job(id="job-2", user_id=1, task_prompt="y"), "vm-1")
+
+        assert bridge.instance_tasks == {"vm-1": running.id}
+        assert "job-2" not in bridge.jobs
+
+
+class TestFinishJob:
+    """Results reported by a VM"""
+
+    def test_null_artifacts_stored_as_empty_list(self):
+        bridge = OpenClawBridge()
+        job = running_job(bridge)
+
+        bridge._finish_job(
+            FinishJob("vm-1", job.id, JobStatus.COMPLETED, {"artifacts": None})
+        )
+
+        assert job.artifacts == []
+        assert job.artifacts_json() == b"[]"
+        assert not job.is_active
+
+    def test_null_artifacts_keep_step_artifacts(self):
+        bridge = OpenClawBridge()
+        job = running_job(bridge)
+        bridge._add_artifacts(AddArtifacts(job.id, [{"name": "a.png"}]))
+
+        bridge._finish_job(
+            FinishJob("vm-1", job.id, JobStatus.COMPLETED, {"artifacts": None})
+        )
+
+        assert job.artifacts == [{"name": "a.png"}]
+
+    def test_other_instance_cannot_finish_task(self):
+        bridge = OpenClawBridge()
+        job = running_job(bridge)
+        other = connect(bridge, "vm-2")
+        other.status = "busy"
+
+        bridge._finish_job(FinishJob("vm-2", job.id, JobStatus.COMPLETED, {"result": "x"}))
+
+        assert job.status == JobStatus.RUNNING
+        assert job.result is None
+        assert bridge.instance_tasks == {"vm-1": job.id}
+        assert other.status == "busy"
+
+    def test_cancelled_job_keeps_its_outcome(self):
+        bridge = OpenClawBridge()
+        job = running_job(bridge)
+        job.status = JobStatus.CANCELLED
+
+        bridge._finish_job(FinishJob("vm-1", job.id, JobStatus.COMPLETED, {"result": "x"}))
+
+        assert job.status == JobStatus.CANCELLED
+        assert job.result is None
+
+    @pytest.mark.parametrize("error", [None, "boom", ["boom"]])
+    def test_non_dict_error_releases_instance(self, error):
+        bridge = OpenClawBridge()
+        connection = connect(bridge)
+        connection.status = "busy"
+        job = running_job(bridge)
+
+        bridge._finish_job(FinishJob("vm-1", job.id, JobStatus.FAILED, error))
+
+        assert job.status == JobStatus.FAILED
+        assert job.error_message == (str(error) if error else None)
+        assert bridge.instance_tasks == {}
+        assert connection.status == "online"
+
+
+class TestStepArtifacts:
+    """Artifacts reported with task_step_completed events"""
+
+    def test_step_events_append_artifacts(self):
+        bridge = OpenClawBridge()
+        job = running_job(bridge)
+        job.artifacts_json()  # Cached before the first append
+        connection = VMConnection("vm-1", FakeWebSocket(), "token", 1)
+
+        async def run():
+            for i in range(3):
+                event = Event.from_trusted(
+                    {
+                        "type": "task_step_completed",
+                        "job_id": job.id,
+                        "payload": {"artifacts": [{"name": f"step-{i}.png"}]},
+                    }
+                )
+                await bridge._handle_vm_event(connection, event)
+            await asyncio.sleep(0)  # Let the state task drain
+            bridge._state_task.cancel()
+
+        asyncio.run(run())
+
+        assert [a["name"] for a in job.artifacts] == [
+            "step-0.png",
+            "step-1.png",
+            "step-2.png",
+        ]
+        assert job.artifacts_json() == json_dumps(job.artifacts)
+
+    def test_finished_job_ignores_late_artifacts(self):
+        bridge = OpenClawBridge()
+        job = running_job(bridge)
+        job.status = JobStatus.COMPLETED
+
+        bridge._add_artifacts(AddArtifacts(job.id, [{"name": "late.png"}]))
+
+        assert job.artifacts == []
+
+
+class FakePool:
+    """asyncpg pool whose connection returns canned EXPIRE_APPROVALS_SQL batches."""
+
+    def __init__(self, batch_sizes):
+        self.batch_sizes = list(batch_sizes)
+        self.calls = []
+
+    @asynccontextmanager
+    async def acquire(self):
+        yield self
+
+    async def fetch(self, query, *args):
+        self.calls.append((query, args))
+        return [{"request_id": "r", "task_id": None}] * self.batch_sizes.pop(0)
+
+
+class TestApprovalGateExpiry:
+    """Overdue approval_gates rows are timed out in batches"""
+
+    def test_batches_until_a_short_one(self, monkeypatch):
+        monkeypatch.setattr(bridge_module, "APPROVAL_EXPIRY_BATCH_SIZE", 2)
+        bridge = OpenClawBridge()
+        bridge.db_pool = FakePool([2, 2, 1])
+
+        assert asyncio.run(bridge._expire_approval_gates()) == 5
+        assert [args for _, args in bridge.db_pool.calls] == [(2,), (2,), (2,)]
+        assert bridge.db_pool.calls[0][0] == EXPIRE_APPROVALS_SQL
+
+
+class RecordingWebSocket:
+    """Collects the ASGI messages the writer sends."""
+
+    def __init__(self):
+        self.sent = []
+
+    async def send(self, message):
+        self.sent.append(message)
+
+
+def encoded(event_type, job_id="job-1"):
+    return EncodedEvent(Event.from_trusted({"type": event_type, "job_id": job_id}))
+
+
+class TestOutboundQueue:
+    """Bounded send queue: shedding and event coalescing"""
+
+    def test_full_queue_drops_oldest_droppable_event(self):
+        queue = OutboundQueue(RecordingWebSocket(), "test", maxsize=3)
+        status = encoded("job_started")
+        log = encoded("log")
+        queue.put(status)
+        queue.put(log)
+        queue.put({"type": "pong"})
+
+        queue.put(encoded("job_completed"))
+
+        assert log not in queue.pending
+        assert queue.pending[0] is status
+        assert len(queue.pending) == 3
+
+    def test_full_queue_without_droppable_drops_oldest(self):
+        queue = OutboundQueue(RecordingWebSocket(), "test", maxsize=2)
+        queue.put({"n": 1})
+        queue.put({"n": 2})
+        queue.put({"n": 3})
+
+        assert list(queue.pending) == [{"n": 2}, {"n": 3}]
+
+    def test_closed_queue_rejects(self):
+        queue = OutboundQueue(RecordingWebSocket(), "test")
+        queue.stop()
+        assert queue.put({"type": "pong"}) is False
+
+    def test_events_coalesced_and_other_frames_kept_in_order(self):
+        websocket = RecordingWebSocket()
+
+        async def run():
+            queue = OutboundQueue(websocket, "test", batch_size=16, batch_wait=0.01)
+            for _ in range(3):
+                queue.put(encoded("log"))
+            queue.put(b'{"type":"pong"}')
+            queue.put(encoded("log"))
+            queue.start()
+            await asyncio.sleep(0.05)
+            queue.stop()
+
+        asyncio.run(run())
+
+        frames = [orjson.loads(message["text"]) for message in websocket.sent]
+        assert [frame["type"] for frame in frames] == ["event_batch", "pong", "event"]
+        assert len(frames[0]["events"]) == 3
+
+    def test_binary_transport(self):
+        websocket = RecordingWebSocket()
+
+        async def run():
+            queue = OutboundQueue(websocket, "test", binary=True)
+            queue.put({"type": "ping"})
+            queue.start()
+            await asyncio.sleep(0)
+            queue.stop()
+
+        asyncio.run(run())
+
+        assert websocket.sent == [{"type": "websocket.send", "bytes": b'{"type":"ping"}'}]
+
+
+class TestJobCache:
+    """Active jobs pinned, finished jobs in a bounded LRU"""
+
+    def make_job(self, job_id, status=JobStatus.COMPLETED):
+        return Job(id=job_id, user_id=1, task_prompt="x", status=status)
+
+    def test_finished_jobs_evicted_oldest_first(self):
+        cache = JobCache(maxsize=2)
+        for job_id in ("a", "b", "c"):
+            cache[job_id] = self.make_job(job_id)
+
+        assert "a" not in cache
+        assert list(cache) == ["b", "c"]
+
+    def test_get_refreshes_lru_position(self):
+        cache = JobCache(maxsize=2)
+        cache["a"] = self.make_job("a")
+        cache["b"] = self.make_job("b")
+        cache.get("a")
+        cache["c"] = self.make_job("c")
+
+        assert "a" in cache
+        assert "b" not in cache
+
+    def test_active_jobs_never_evicted(self):
+        cache = JobCache(maxsize=1)
+        cache["run"] = self.make_job("run", JobStatus.RUNNING)
+        for job_id in ("a", "b", "c"):
+            cache[job_id] = self.make_job(job_id)
+
+        assert "run" in cache
+        assert len(cache) == 2
+
+    def test_settle_makes_job_evictable(self):
+        cache = JobCache(maxsize=1)
+        job = self.make_job("run", JobStatus.RUNNING)
+        cache["run"] = job
+        job.status = JobStatus.COMPLETED
+        cache.settle("run")
+        cache["a"] = self.make_job("a")
+
+        assert "run" not in cache
+        assert cache["a"].id == "a"
+
+    def test_delete_and_missing(self):
+        cache = JobCache()
+        cache["run"] = self.make_job("run", JobStatus.RUNNING)
+        cache["done"] = self.make_job("done")
+        del cache["run"]
+        del cache["done"]
+
+        assert len(cache) == 0
+        assert cache.get("done") is None
+        with pytest.raises(KeyError):
+            cache["done"]
+
+
+class FakeRelayConnection:
+    """asyncpg connection that records NOTIFY batches and listeners."""
+
+    def __init__(self):
+        self.notifications = []
+        self.inserts = []
+        self.listeners = {}
+
+    async def add_listener(self, channel, callback):
+        self.listeners[channel] = callback
+
+    async def remove_listener(self, channel, callback):
+        self.listeners.pop(channel, None)
+
+    async def execute(self, query, *args):
+        if query == NOTIFY_EVENTS_SQL:
+            self.notifications.extend(args[1])
+        elif query == INSERT_EVENTS_SQL:
+            self.inserts.append(args)
+
+
+class FakeAcquire:
+    """pool.acquire(): awaitable and usable as ``async with``, like asyncpg's."""
+
+    def __init__(self, conn):
+        self.conn = conn
+
+    def __await__(self):
+        yield from []
+        return self.conn
+
+    async def __aenter__(self):
+        return self.conn
+
+    async def __aexit__(self, *exc):
+        return False
+
+
+class FakeRelayPool:
+    def __init__(self):
+        self.conn = FakeRelayConnection()
+
+    def acquire(self):
+        return FakeAcquire(self.conn)
+
+    async def release(self, conn):
+        pass
+
+
+class TestEventRelay:
+    """Broadcast events reach subscribers on other workers"""
+
+    def test_job_completion_relayed_to_other_worker(self):
+        pool = FakeRelayPool()
+
+        async def run():
+            worker = OpenClawBridge()
+            await worker.start(db_pool=pool, relay_events=True)
+            job = running_job(worker)
+            # No subscriber on this worker: the event must still be published
+            worker._finish_job(FinishJob("vm-1", job.id, JobStatus.COMPLETED, {}))
+            await worker.stop()
+
+        asyncio.run(run())
+
+        other = OpenClawBridge()
+        subscriber = OutboundQueue(RecordingWebSocket(), "subscriber")
+        other.event_subscribers["job-1"] = [subscriber]
+        for payload in pool.conn.notifications:
+            other._on_relayed_event(None, 0, "openclaw_events", payload)
+
+        types = [orjson.loads(m.event_json)["type"] for m in subscriber.pending]
+        assert types == ["job_completed"]
+
+    def test_own_events_not_delivered_twice(self):
+        bridge = OpenClawBridge()
+        subscriber = OutboundQueue(RecordingWebSocket(), "subscriber")
+        bridge.event_subscribers["job-1"] = [subscriber]
+        event = Event.from_trusted({"type": "log", "job_id": "job-1"})
+
+        bridge._on_relayed_event(
+            None, 0, "openclaw_events", bridge._origin + event.json_bytes().decode()
+        )
+
+        assert not subscriber.pending
+
+
+class TestEventPersistence:
+    """Batched INSERTs of VM events"""
+
+    def test_stop_writes_the_batch_in_flight(self):
+        pool = FakeRelayPool()
+        task_ids = [str(uuid.uuid4()) for _ in range(3)]
+
+        async def run():
+            bridge = OpenClawBridge()
+            await bridge.start(db_pool=pool)
+            for task_id in task_ids:
+                event = Event.from_trusted({"type": "log", "job_id": task_id})
+                await bridge._handle_vm_event(None, event)
+            await asyncio.sleep(0)  # The loop has taken the first event
+            await bridge.stop()
+
+        asyncio.run(run())
+
+        stored = [str(task_id) for args in pool.conn.inserts for task_id in args[0]]
+        assert stored == task_ids
+
+    def test_created_at_is_timezone_aware_utc(self):
+        pool = FakeRelayPool()
+        bridge = OpenClawBridge()
+        bridge.db_pool = pool
+        event = Event.from_trusted(
+            {"type": "log", "job_id": str(uuid.uuid4()), "timestamp_ns": 1_700_000_000_000_000_000}
+        )
+
+        asyncio.run(bridge._persist_events([event]))
+
+        (created_at,) = pool.conn.inserts[0][3]
+        assert created_at.tzinfo is timezone.utc
+        assert created_at.timestamp() == 1_700_000_000
@@ -0,0 +1,142 @@
+"""
+Tests for the OpenClaw WebSocket endpoints
+"""
+
+import uuid
+from contextlib import asynccontextmanager
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+import plugins.openclaw.routes as routes
+from plugins.core.events import EventType
+from plugins.core.migration import INSERT_EVENTS_SQL
+from plugins.openclaw.bridge import OpenClawBridge
+
+VM_PATH = "/api/openclaw/ws/openclaw/vm/vm-1"
+TASK_PATH = "/api/openclaw/ws/openclaw/tasks/task-1"
+
+
+@pytest.fixture
+def bridge(monkeypatch):
+    """A fresh bridge per test instead of the module-level singleton."""
+    fresh = OpenClawBridge()
+    monkeypatch.setattr(routes, "bridge", fresh)
+    return fresh
+
+
+@pytest.fixture
+def client(bridge):
+    app = FastAPI()
+    app.include_router(routes.router)
+    return TestClient(app)
+
+
+def authenticate(ws):
+    ws.send_text('{"type": "auth", "token": "token"}')
+    welcome = ws.receive_bytes()
+    assert b'"type":"connected"' in welcome
+
+
+class TestVMWebSocketMalformedFrames:
+    """Malformed VM frames are logged and the socket is closed with 1003"""
+
+    @pytest.mark.parametrize(
+        "frame",
+        [
+            '{"type": "event", "event": {}}',
+            '{"type": "event", "event": {"type": "log"}}',
+            '{"type": "event", "event": {"type": "no_such_type", "job_id": "j"}}',
+            '{"type": "event", "event": []}',
+            "not json",
+            "[1, 2, 3]",
+        ],
+    )
+    def test_malformed_frame_closes_with_1003(self, client, bridge, frame):
+        with client.websocket_connect(VM_PATH) as ws:
+            authenticate(ws)
+            ws.send_text(frame)
+            message = ws.receive()
+
+        assert message == {"type": "websocket.close", "code": 1003, "reason": ""}
+        assert "vm-1" not in bridge.connections
+
+    def test_well_formed_event_is_handled(self, client, bridge):
+        received = []
+
+        async def on_log(event):
+            received.append(event)
+
+        bridge.on_event(EventType.LOG, on_log)
+        with client.websocket_connect(VM_PATH) as ws:
+            authenticate(ws)
+            ws.send_text('{"type": "event", "event": {"type": "log", "job_id": "j"}}')
+            # Frames are handled in order: the close proves the event was processed
+            ws.send_text("not json")
+            assert ws.receive()["code"] == 1003
+
+        assert [event.job_id for event in received] == ["j"]
+
+
+class TestTaskWebSocketMalformedFrames:
+    """Malformed client frames on task sockets are handled the same way"""
+
+    def test_non_json_closes_with_1003(self, client, bridge):
+        with client.websocket_connect(TASK_PATH) as ws:
+            ws.send_text("not json")
+            message = ws.receive()
+
+        assert message["code"] == 1003
+        assert not bridge._subscriber_queues
+
+    def test_ping_gets_pong(self, client):
+        with client.websocket_connect(TASK_PATH) as ws:
+            ws.send_text('{"type": "ping"}')
+            assert ws.receive_text() == '{"type":"pong"}'
+
+
+class RecordingPool:
+    """asyncpg pool stand-in that records executed statements."""
+
+    def __init__(self):
+        self.executed = []
+
+    @asynccontextmanager
+    async def acquire(self):
+        yield self
+
+    async def execute(self, query, *args):
+        self.executed.append((query, args))
+
+
+class TestAppLifespan:
+    """The bridge runs for the app's lifetime via bridge_lifespan"""
+
+    def test_vm_events_persisted_through_the_app(self, bridge):
+        pool = RecordingPool()
+
+        @asynccontextmanager
+        async def lifespan(app):
+            async with routes.bridge_lifespan(pool):
+                yield
+
+        app = FastAPI(lifespan=lifespan)
+        app.include_router(routes.router)
+        task_id = str(uuid.uuid4())
+
+        with TestClient(app) as client:
+            assert bridge.db_pool is pool
+            assert bridge._cleanup_task is not None and not bridge._cleanup_task.done()
+            with client.websocket_connect(VM_PATH) as ws:
+                authenticate(ws)
+                ws.send_text(
+                    f'{{"type": "event", "event": {{"type": "log", "job_id": "{task_id}"}}}}'
+                )
+                ws.send_text("not json")  # Processed in order: the close follows the event
+                assert ws.receive()["code"] == 1003
+
+        # Stopping the bridge on shutdown writes out what is still queued
+        inserts = [args for query, args in pool.executed if query == INSERT_EVENTS_SQL]
+        assert [str(task) for args in inserts for task in args[0]] == [task_id]
+        assert bridge.db_pool is pool and not bridge._running
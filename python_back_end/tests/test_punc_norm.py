@@ -0,0 +1,36 @@
+"""
+Parity tests: cody.fast_punc_norm must match chatterbox.tts.punc_norm exactly
+"""
+
+import pytest
+
+chatterbox_tts = pytest.importorskip("chatterbox.tts")
+
+from cody import fast_punc_norm
+
+
+CASES = [
+    "",
+    "hello world",
+    "Hello world.",
+    "Already ends with a question?",
+    "Wait...what",
+    "Ellipsis… char",
+    "Time: 10:30",
+    "Range a - b and c – d and e — f",
+    "One; two; three",
+    "“Quoted” and ‘single’ marks",
+    "It’s here , right ,",
+    "  lots   of\twhitespace \n here  ",
+    "trailing spaces   ",
+    "ends with dash -",
+    "ends with comma,",
+    "Mixed: “one”; two… three — four - five",
+    "a",
+    "123 numbers first",
+]
+
+
+@pytest.mark.parametrize("text", CASES)
+def test_matches_chatterbox_punc_norm(text):
+    assert fast_punc_norm(text) == chatterbox_tts.punc_norm(text)